@@ -0,0 +1,47 @@
+import os
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import FileResponse, Http404
+from django.shortcuts import render
+from .profiling import list_captures
+from .slow_queries import group_slow_queries
+
+PROFILE_EXTENSIONS = ("prof", "folded", "json")
+
+
+@staff_member_required
+def profile_list(request):
+    return render(
+        request,
+        "admin/profiles.html",
+        {
+            **admin.site.each_context(request),
+            "title": "Профили запросов",
+            "captures": list_captures(),
+        },
+    )
+
+
+@staff_member_required
+def profile_download(request, name, extension):
+    if extension not in PROFILE_EXTENSIONS or os.path.basename(name) != name:
+        raise Http404
+    path = os.path.join(str(settings.PROFILER_DIR), f"{name}.{extension}")
+    if not os.path.isfile(path):
+        raise Http404
+    return FileResponse(open(path, "rb"), as_attachment=True)
+
+
+@staff_member_required
+def slow_query_list(request):
+    return render(
+        request,
+        "admin/slow_queries.html",
+        {
+            **admin.site.each_context(request),
+            "title": "Медленные запросы к базе",
+            "threshold_ms": settings.SLOW_QUERY_THRESHOLD_MS,
+            "groups": group_slow_queries(),
+        },
+    )
@@ -0,0 +1,276 @@
+import base64
+import io
+import random
+import statistics
+import timeit
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.db.models import Prefetch, Sum
+from PIL import Image
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory, force_authenticate
+from recipes.catalog import build_catalog
+from recipes.models import (
+    Favorite,
+    Follow,
+    Ingredient,
+    Recipe,
+    RecipeIngredient,
+    ShoppingCart,
+    ShoppingCartIngredient,
+)
+from .fast_serializers import FastFollowSerializer, FastRecipeListSerializer
+from .fields import Base64ImageField
+from .filters import RecipeFilter
+from .serializers import FollowSerializer, IngredientSerializer, RecipeReadSerializer
+from .views import IngredientViewSet, RecipeViewSet
+
+User = get_user_model()
+
+SYLLABLES = ("ка", "ра", "мо", "ли", "то", "се", "ба", "ну", "пе", "ро", "ди", "жу")
+INGREDIENT_COUNT = 2000
+USER_COUNT = 300
+RECIPE_COUNT = 1200
+RECIPE_INGREDIENT_COUNT = 8
+FAVORITE_COUNT = 400
+SHOPPING_CART_COUNT = 300
+FOLLOW_COUNT = 50
+RECIPE_SIZES = (10, 100, 1000)
+SEARCH_PREFIXES = ("к", "ра", "мол", "себ", "пеДи")
+factory = APIRequestFactory()
+
+
+def seed_benchmark_data(seed):
+    # Данные создаются bulk_create без сигналов, поэтому сводка списка
+    # покупок и снимок каталога собираются в конце явно.
+    rnd = random.Random(seed)
+    Ingredient.objects.bulk_create(
+        Ingredient(
+            name=f"{''.join(rnd.choices(SYLLABLES, k=3))} {number}",
+            measurement_unit=rnd.choice(("г", "мл", "шт.")),
+        )
+        for number in range(INGREDIENT_COUNT)
+    )
+    ingredient_ids = list(Ingredient.objects.values_list("id", flat=True))
+    User.objects.bulk_create(
+        User(
+            email=f"user{number}@example.com",
+            username=f"user{number}",
+            first_name=f"Имя{number}",
+            last_name=f"Фамилия{number}",
+            avatar=f"users/avatars/{number}.png" if number % 3 else "",
+        )
+        for number in range(USER_COUNT)
+    )
+    users = list(User.objects.order_by("id"))
+    Recipe.objects.bulk_create(
+        Recipe(
+            author=rnd.choice(users),
+            name=f"Рецепт {number}",
+            image=f"recipes/images/{number}.png",
+            text="Описание рецепта. " * rnd.randint(1, 20),
+            cooking_time=rnd.randint(1, 180),
+            kcal=rnd.randint(0, 2000),
+        )
+        for number in range(RECIPE_COUNT)
+    )
+    recipe_ids = list(Recipe.objects.values_list("id", flat=True))
+    RecipeIngredient.objects.bulk_create(
+        RecipeIngredient(
+            recipe_id=recipe_id, ingredient_id=ingredient_id, amount=rnd.randint(1, 500)
+        )
+        for recipe_id in recipe_ids
+        for ingredient_id in rnd.sample(ingredient_ids, RECIPE_INGREDIENT_COUNT)
+    )
+    user = users[0]
+    Favorite.objects.bulk_create(
+        Favorite(user=user, recipe_id=recipe_id)
+        for recipe_id in rnd.sample(recipe_ids, FAVORITE_COUNT)
+    )
+    ShoppingCart.objects.bulk_create(
+        ShoppingCart(user=user, recipe_id=recipe_id)
+        for recipe_id in rnd.sample(recipe_ids, SHOPPING_CART_COUNT)
+    )
+    Follow.objects.bulk_create(
+        Follow(user=user, author=author)
+        for author in rnd.sample(users[1:], FOLLOW_COUNT)
+    )
+    ShoppingCartIngredient.objects.bulk_create(
+        ShoppingCartIngredient(
+            user=user, ingredient_id=row["ingredient_id"], total_amount=row["total"]
+        )
+        for row in RecipeIngredient.objects.filter(
+            recipe__in_shopping_cart_of__user=user
+        )
+        .values("ingredient_id")
+        .annotate(total=Sum("amount"))
+        .order_by()
+    )
+    build_catalog()
+    return user
+
+
+def make_png(seed, size=256):
+    rnd = random.Random(seed)
+    buffer = io.BytesIO()
+    Image.frombytes("RGB", (size, size), rnd.randbytes(size * size * 3)).save(
+        buffer, "PNG"
+    )
+    return "data:image/png;base64," + base64.b64encode(buffer.getvalue()).decode()
+
+
+def make_request(user, path="/api/"):
+    request = Request(factory.get(path, HTTP_HOST="localhost"))
+    request.user = user or AnonymousUser()
+    return request
+
+
+def render(data):
+    return JSONRenderer().render(data)
+
+
+def serialize_recipes(user, size):
+    request = make_request(user)
+    queryset = (
+        Recipe.objects.order_by("-pub_date", "-id")
+        .select_related("author")
+        .prefetch_related(
+            Prefetch(
+                "recipeingredients",
+                queryset=RecipeIngredient.objects.select_related("ingredient"),
+            )
+        )[:size]
+    )
+    return RecipeReadSerializer(queryset, many=True, context={"request": request}).data
+
+
+def serialize_recipes_fast(user, size):
+    request = make_request(user)
+    queryset = Recipe.objects.order_by("-pub_date", "-id").values(
+        *FastRecipeListSerializer.values_fields
+    )[:size]
+    return FastRecipeListSerializer(queryset, context={"request": request}).data
+
+
+def serialize_follows(user, recipes_limit):
+    request = make_request(user, f"/api/?recipes_limit={recipes_limit}")
+    authors = User.objects.filter(following__user=user).order_by("id")
+    return FollowSerializer(authors, many=True, context={"request": request}).data
+
+
+def serialize_follows_fast(user, recipes_limit):
+    request = make_request(user, f"/api/?recipes_limit={recipes_limit}")
+    authors = (
+        User.objects.filter(following__user=user)
+        .order_by("id")
+        .values(*FastFollowSerializer.values_fields)
+    )
+    return FastFollowSerializer(authors, context={"request": request}).data
+
+
+def filter_recipes(user, data):
+    return list(
+        RecipeFilter(
+            data, queryset=Recipe.objects.all(), request=make_request(user)
+        ).qs.values_list("id", flat=True)
+    )
+
+
+def search_ingredients(prefixes):
+    view = IngredientViewSet.as_view({"get": "list"})
+    for prefix in prefixes:
+        view(factory.get("/api/ingredients/", {"name": prefix})).content
+
+
+def search_ingredients_orm(prefixes):
+    for prefix in prefixes:
+        render(
+            IngredientSerializer(
+                Ingredient.objects.filter(name__istartswith=prefix), many=True
+            ).data
+        )
+
+
+def download_shopping_cart(user):
+    request = factory.get("/api/recipes/download_shopping_cart/")
+    force_authenticate(request, user=user)
+    return RecipeViewSet.as_view({"get": "download_shopping_cart"})(request).content
+
+
+def get_benchmarks(user):
+    image = make_png(0)
+    field = Base64ImageField()
+    benchmarks = []
+    for size in RECIPE_SIZES:
+        benchmarks += [
+            (
+                f"recipe_read_serializer[{size}]",
+                lambda size=size: render(serialize_recipes(user, size)),
+            ),
+            (
+                f"fast_recipe_list_serializer[{size}]",
+                lambda size=size: render(serialize_recipes_fast(user, size)),
+            ),
+        ]
+    benchmarks += [
+        (
+            "follow_serializer[recipes_limit=3]",
+            lambda: render(serialize_follows(user, 3)),
+        ),
+        (
+            "fast_follow_serializer[recipes_limit=3]",
+            lambda: render(serialize_follows_fast(user, 3)),
+        ),
+        (
+            "recipe_filter[is_favorited=1]",
+            lambda: filter_recipes(user, {"is_favorited": "1"}),
+        ),
+        (
+            "recipe_filter[is_favorited=0]",
+            lambda: filter_recipes(user, {"is_favorited": "0"}),
+        ),
+        (
+            "recipe_filter[is_in_shopping_cart=1]",
+            lambda: filter_recipes(user, {"is_in_shopping_cart": "1"}),
+        ),
+        (
+            "recipe_filter[is_in_shopping_cart=0]",
+            lambda: filter_recipes(user, {"is_in_shopping_cart": "0"}),
+        ),
+        ("ingredient_search[catalog]", lambda: search_ingredients(SEARCH_PREFIXES)),
+        ("ingredient_search[orm]", lambda: search_ingredients_orm(SEARCH_PREFIXES)),
+        ("base64_image_decode[256x256]", lambda: field.to_internal_value(image)),
+        (
+            f"download_shopping_cart[{SHOPPING_CART_COUNT}]",
+            lambda: download_shopping_cart(user),
+        ),
+    ]
+    return benchmarks
+
+
+def check_parity(user):
+    # Быстрые сериализаторы должны отдавать байт в байт то же, что и DRF.
+    mismatches = []
+    for current_user in (None, user):
+        if render(serialize_recipes(current_user, 100)) != render(
+            serialize_recipes_fast(current_user, 100)
+        ):
+            mismatches.append(f"recipes (user={current_user})")
+    for recipes_limit in (0, 3):
+        if render(serialize_follows(user, recipes_limit)) != render(
+            serialize_follows_fast(user, recipes_limit)
+        ):
+            mismatches.append(f"follows (recipes_limit={recipes_limit})")
+    return mismatches
+
+
+def run_benchmark(function, repeat):
+    function()
+    timings = [
+        timing * 1000 for timing in timeit.repeat(function, number=1, repeat=repeat)
+    ]
+    return {
+        "min_ms": round(min(timings), 3),
+        "median_ms": round(statistics.median(timings), 3),
+    }
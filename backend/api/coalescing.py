@@ -0,0 +1,157 @@
+import hashlib
+import os
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlencode
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+from rest_framework.response import Response
+from recipes.changelog import get_generation
+from recipes.constants import (
+    COALESCE_FRESH_TIMEOUT,
+    COALESCE_LOCK_STRIPES,
+    COALESCE_STALE_TIMEOUT,
+    COALESCE_WAIT_TIMEOUT,
+)
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# Анонимные ответы о рецептах зависят только от этих моделей.
+COALESCE_MODELS = ("recipes.recipe", "recipes.recipeingredient", "users.user")
+IGNORED_PARAMS = ("_profile",)
+LOCK_POLL_INTERVAL = 0.01
+process_locks = [threading.Lock() for _ in range(COALESCE_LOCK_STRIPES)]
+
+
+def get_request_key(request):
+    params = sorted(
+        (name, value)
+        for name, values in request.query_params.lists()
+        if name not in IGNORED_PARAMS
+        for value in values
+    )
+    normalized = "|".join(
+        (
+            request.scheme,
+            request.get_host(),
+            request.path,
+            urlencode(params),
+            request.accepted_media_type or "",
+        )
+    )
+    return hashlib.sha1(normalized.encode()).hexdigest()
+
+
+@contextmanager
+def stripe_lock(key, timeout):
+    # Блокировка на один из COALESCE_LOCK_STRIPES слотов: threading.Lock
+    # внутри процесса и flock на файл слота между воркерами.
+    stripe = int(key[:8], 16) % COALESCE_LOCK_STRIPES
+    deadline = time.monotonic() + timeout
+    process_lock = process_locks[stripe]
+    if timeout:
+        acquired = process_lock.acquire(timeout=timeout)
+    else:
+        acquired = process_lock.acquire(blocking=False)
+    if not acquired:
+        yield False
+        return
+    try:
+        if fcntl is None:
+            yield True
+            return
+        os.makedirs(settings.COALESCE_LOCK_DIR, exist_ok=True)
+        lock_path = os.path.join(settings.COALESCE_LOCK_DIR, f"{stripe}.lock")
+        with open(lock_path, "a") as lock_file:
+            while True:
+                try:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    break
+                except BlockingIOError:
+                    if time.monotonic() >= deadline:
+                        yield False
+                        return
+                    time.sleep(LOCK_POLL_INTERVAL)
+            try:
+                yield True
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+    finally:
+        process_lock.release()
+
+
+def build_response(entry, key):
+    response = HttpResponse(
+        entry["content"], content_type=entry["content_type"], status=entry["status"]
+    )
+    # Сжатое тело тоже кешируется, пока не сменится версия записи.
+    response.compression_cache_key = f"coalesce:{key}:{entry['computed_at']}"
+    response.compression_cache_timeout = COALESCE_FRESH_TIMEOUT + COALESCE_STALE_TIMEOUT
+    return response
+
+
+def compute_entry(view, request, handler, args, kwargs, key, generation):
+    response = handler(request, *args, **kwargs)
+    if not isinstance(response, Response) or response.status_code != 200:
+        return response, None
+    response.accepted_renderer = request.accepted_renderer
+    response.accepted_media_type = request.accepted_media_type
+    response.renderer_context = view.get_renderer_context()
+    response.render()
+    entry = {
+        "generation": generation,
+        "computed_at": time.time_ns(),
+        "fresh_until": time.time() + COALESCE_FRESH_TIMEOUT,
+        "status": response.status_code,
+        "content_type": response["Content-Type"],
+        "content": response.content,
+    }
+    caches[settings.SHARED_CACHE_ALIAS].set(
+        f"coalesce:{key}", entry, COALESCE_FRESH_TIMEOUT + COALESCE_STALE_TIMEOUT
+    )
+    return response, entry
+
+
+def is_fresh(entry, generation):
+    return entry["generation"] == generation and entry["fresh_until"] > time.time()
+
+
+def coalesce(view, request, handler, *args, **kwargs):
+    # Single-flight для анонимных GET: ответ считает один воркер, остальные
+    # ждут его или, пока он пересчитывает устаревший ответ, отдают старый.
+    # Кешируется только JSON: HTML-страница DRF содержит CSRF-токен и не
+    # должна доставаться другим клиентам.
+    if (
+        request.method != "GET"
+        or request.user.is_authenticated
+        or request.accepted_renderer.format != "json"
+    ):
+        return handler(request, *args, **kwargs)
+    key = get_request_key(request)
+    cache = caches[settings.SHARED_CACHE_ALIAS]
+    generation = get_generation(COALESCE_MODELS)
+    entry = cache.get(f"coalesce:{key}")
+    if entry is not None and is_fresh(entry, generation):
+        return build_response(entry, key)
+    if entry is not None:
+        with stripe_lock(key, 0) as acquired:
+            if not acquired:
+                return build_response(entry, key)
+            response, _ = compute_entry(
+                view, request, handler, args, kwargs, key, generation
+            )
+            return response
+    with stripe_lock(key, COALESCE_WAIT_TIMEOUT) as acquired:
+        if acquired:
+            entry = cache.get(f"coalesce:{key}")
+            if entry is not None and entry["generation"] == generation:
+                return build_response(entry, key)
+        response, _ = compute_entry(
+            view, request, handler, args, kwargs, key, generation
+        )
+        return response
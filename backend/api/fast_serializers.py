@@ -0,0 +1,191 @@
+from collections import defaultdict
+from django.contrib.auth import get_user_model
+from django.db.models import Count, F, Window
+from django.db.models.functions import RowNumber
+from recipes.models import Favorite, Recipe, RecipeIngredient, ShoppingCart
+from recipes.nutrition import NUTRIENTS
+from .fields import build_absolute_media_url
+
+User = get_user_model()
+
+USER_FIELDS = ("email", "id", "username", "first_name", "last_name", "avatar")
+
+
+def get_avatar_url(name):
+    if not name:
+        return None
+    return User._meta.get_field("avatar").storage.url(name)
+
+
+def get_image_url(request, name):
+    if not name:
+        return None
+    url = Recipe._meta.get_field("image").storage.url(name)
+    if request:
+        return build_absolute_media_url(request, url)
+    return url
+
+
+def get_current_user(context):
+    request = context.get("request")
+    if request and request.user.is_authenticated:
+        return request.user
+    return None
+
+
+def build_user(row, is_subscribed):
+    return {
+        "email": row["email"],
+        "id": row["id"],
+        "username": row["username"],
+        "first_name": row["first_name"],
+        "last_name": row["last_name"],
+        "is_subscribed": is_subscribed,
+        "avatar": get_avatar_url(row["avatar"]),
+    }
+
+
+class FastRecipeListSerializer:
+    # Повторяет вывод RecipeReadSerializer(many=True) для строк из values().
+    values_fields = (
+        "id",
+        "author_id",
+        "name",
+        "image",
+        "text",
+        "cooking_time",
+        *NUTRIENTS,
+    )
+
+    def __init__(self, rows, context):
+        self.rows = list(rows)
+        self.context = context
+
+    @property
+    def data(self):
+        request = self.context.get("request")
+        user = get_current_user(self.context)
+        recipe_ids = [row["id"] for row in self.rows]
+        author_ids = {row["author_id"] for row in self.rows}
+        authors = {
+            row["id"]: row
+            for row in User.objects.filter(id__in=author_ids).values(*USER_FIELDS)
+        }
+        ingredients = defaultdict(list)
+        for ingredient in (
+            RecipeIngredient.objects.filter(recipe_id__in=recipe_ids)
+            .order_by("ingredient__name", "id")
+            .values(
+                "recipe_id",
+                "ingredient_id",
+                "ingredient__name",
+                "ingredient__measurement_unit",
+                "amount",
+            )
+        ):
+            ingredients[ingredient["recipe_id"]].append(
+                {
+                    "id": ingredient["ingredient_id"],
+                    "name": ingredient["ingredient__name"],
+                    "measurement_unit": ingredient["ingredient__measurement_unit"],
+                    "amount": ingredient["amount"],
+                }
+            )
+        subscribed = set()
+        favorited = set()
+        in_shopping_cart = set()
+        if user is not None:
+            subscribed = set(
+                user.follower.filter(author_id__in=author_ids).values_list(
+                    "author_id", flat=True
+                )
+            )
+            favorited = set(
+                Favorite.objects.filter(
+                    user=user, recipe_id__in=recipe_ids
+                ).values_list("recipe_id", flat=True)
+            )
+            in_shopping_cart = set(
+                ShoppingCart.objects.filter(
+                    user=user, recipe_id__in=recipe_ids
+                ).values_list("recipe_id", flat=True)
+            )
+        return [
+            {
+                "id": row["id"],
+                "author": build_user(
+                    authors[row["author_id"]], row["author_id"] in subscribed
+                ),
+                "ingredients": ingredients[row["id"]],
+                "is_favorited": row["id"] in favorited,
+                "is_in_shopping_cart": row["id"] in in_shopping_cart,
+                "name": row["name"],
+                "image": get_image_url(request, row["image"]),
+                "text": row["text"],
+                "cooking_time": row["cooking_time"],
+                **{nutrient: row[nutrient] for nutrient in NUTRIENTS},
+            }
+            for row in self.rows
+        ]
+
+
+class FastFollowSerializer:
+    # Повторяет вывод FollowSerializer(many=True) для строк из values().
+    values_fields = USER_FIELDS
+
+    def __init__(self, rows, context):
+        self.rows = list(rows)
+        self.context = context
+
+    def get_recipes_limit(self):
+        request = self.context.get("request")
+        if request and request.query_params.get("recipes_limit"):
+            try:
+                recipes_limit = int(request.query_params.get("recipes_limit"))
+            except ValueError:
+                return None
+            if recipes_limit >= 0:
+                return recipes_limit
+        return None
+
+    @property
+    def data(self):
+        request = self.context.get("request")
+        author_ids = [row["id"] for row in self.rows]
+        recipes_limit = self.get_recipes_limit()
+        recipes_queryset = Recipe.objects.filter(author_id__in=author_ids)
+        if recipes_limit is not None:
+            recipes_queryset = recipes_queryset.annotate(
+                position=Window(
+                    RowNumber(),
+                    partition_by=F("author_id"),
+                    order_by=(F("pub_date").desc(), F("id").asc()),
+                )
+            ).filter(position__lte=recipes_limit)
+        recipes = defaultdict(list)
+        for recipe in recipes_queryset.values(
+            "author_id", "id", "name", "image", "cooking_time"
+        ):
+            recipes[recipe["author_id"]].append(
+                {
+                    "id": recipe["id"],
+                    "name": recipe["name"],
+                    "image": get_image_url(request, recipe["image"]),
+                    "cooking_time": recipe["cooking_time"],
+                }
+            )
+        recipes_count = dict(
+            Recipe.objects.filter(author_id__in=author_ids)
+            .values("author_id")
+            .annotate(count=Count("id"))
+            .order_by()
+            .values_list("author_id", "count")
+        )
+        return [
+            {
+                **build_user(row, True),
+                "recipes": recipes[row["id"]],
+                "recipes_count": recipes_count.get(row["id"], 0),
+            }
+            for row in self.rows
+        ]
@@ -1,7 +1,25 @@
 import base64
-import uuid
 from django.core.files.base import ContentFile
 from rest_framework import serializers
+from foodgram.storage import get_hashed_name
+
+
+def get_absolute_url_prefix(request):
+    prefix = getattr(request, "_absolute_url_prefix", None)
+    if prefix is None:
+        host = request.get_host()
+        port = request.get_port()
+        if ":" not in host and port not in ("80", "443"):
+            host = f"{host}:{port}"
+        prefix = f"{request.scheme}://{host}"
+        request._absolute_url_prefix = prefix
+    return prefix
+
+
+def build_absolute_media_url(request, url):
+    if not url.startswith("/"):
+        url = f"/{url}"
+    return f"{get_absolute_url_prefix(request)}{url}"
 
 
 class Base64ImageField(serializers.ImageField):
@@ -9,10 +27,10 @@ class Base64ImageField(serializers.ImageField):
     def to_internal_value(self, data):
         if isinstance(data, str) and data.startswith("data:image"):
             try:
-                (format, imgstr) = data.split(";base64,")
+                format, imgstr = data.split(";base64,")
                 ext = format.split("/")[-1]
-                file_name = f"{uuid.uuid4()}.{ext}"
-                data = ContentFile(base64.b64decode(imgstr), name=file_name)
+                content = base64.b64decode(imgstr)
+                data = ContentFile(content, name=get_hashed_name(content, ext))
             except Exception as e:
                 raise serializers.ValidationError(
                     "Некорректный формат base64 изображения."
@@ -24,17 +42,7 @@ class Base64ImageField(serializers.ImageField):
             return None
         request = self.context.get("request")
         if request:
-            host = request.get_host()
-            scheme = request.scheme
-            port = request.get_port()
-            if ":" not in host and port not in ("80", "443"):
-                host_with_port = f"{host}:{port}"
-            else:
-                host_with_port = host
-            image_url = value.url
-            if not image_url.startswith("/"):
-                image_url = f"/{image_url}"
-            return f"{scheme}://{host_with_port}{image_url}"
+            return build_absolute_media_url(request, value.url)
         if hasattr(value, "url"):
             return value.url
         return None
@@ -1,4 +1,5 @@
 from django_filters import rest_framework as filters
+from rest_framework.filters import OrderingFilter
 from recipes.models import Recipe
 from django.contrib.auth import get_user_model
 
@@ -13,6 +14,14 @@ class RecipeFilter(filters.FilterSet):
     author = filters.ModelChoiceFilter(queryset=User.objects.all())
     is_favorited = filters.BooleanFilter(method="filter_is_favorited")
     is_in_shopping_cart = filters.BooleanFilter(method="filter_is_in_shopping_cart")
+    kcal_min = filters.NumberFilter(field_name="kcal", lookup_expr="gte")
+    kcal_max = filters.NumberFilter(field_name="kcal", lookup_expr="lte")
+    protein_min = filters.NumberFilter(field_name="protein", lookup_expr="gte")
+    protein_max = filters.NumberFilter(field_name="protein", lookup_expr="lte")
+    fat_min = filters.NumberFilter(field_name="fat", lookup_expr="gte")
+    fat_max = filters.NumberFilter(field_name="fat", lookup_expr="lte")
+    carbs_min = filters.NumberFilter(field_name="carbs", lookup_expr="gte")
+    carbs_max = filters.NumberFilter(field_name="carbs", lookup_expr="lte")
 
     class Meta:
         model = Recipe
@@ -35,3 +44,18 @@ class RecipeFilter(filters.FilterSet):
         if value:
             return queryset.none()
         return queryset
+
+
+class RecipeOrderingFilter(OrderingFilter):
+    ordering_aliases = {"trending": "trending_score", "views": "views_count"}
+
+    def get_ordering(self, request, queryset, view):
+        ordering = super().get_ordering(request, queryset, view)
+        if not ordering:
+            return ordering
+        return [self.resolve_alias(term) for term in ordering]
+
+    def resolve_alias(self, term):
+        prefix = "-" if term.startswith("-") else ""
+        field = term.lstrip("-")
+        return prefix + self.ordering_aliases.get(field, field)
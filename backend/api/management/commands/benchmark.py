@@ -0,0 +1,150 @@
+import json
+import os
+import shutil
+import tempfile
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+from api.benchmarks import (
+    check_parity,
+    get_benchmarks,
+    run_benchmark,
+    seed_benchmark_data,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Запускает микробенчмарки сериализаторов, фильтров, поиска ингредиентов "
+        "и списка покупок на тестовой базе с фиксированными данными и сравнивает "
+        "результат с сохраненными базовыми значениями."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--repeat", type=int, default=20, help="Количество замеров на бенчмарк."
+        )
+        parser.add_argument(
+            "--seed", type=int, default=1, help="Зерно генератора тестовых данных."
+        )
+        parser.add_argument(
+            "-k",
+            "--filter",
+            default="",
+            help="Запускать только бенчмарки, в названии которых есть строка.",
+        )
+        parser.add_argument(
+            "--baseline",
+            default=str(settings.BENCHMARK_BASELINE_PATH),
+            help="Файл с базовыми значениями.",
+        )
+        parser.add_argument(
+            "--save",
+            action="store_true",
+            help="Сохранить результаты как новые базовые значения.",
+        )
+        parser.add_argument(
+            "--tolerance",
+            type=float,
+            default=0.2,
+            help="Допустимое замедление относительно базового значения (0.2 = 20%%).",
+        )
+
+    def handle(self, *args, **options):
+        old_name = connection.settings_dict["NAME"]
+        media_root = tempfile.mkdtemp()
+        connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False
+        )
+        try:
+            with override_settings(
+                DEBUG=False,
+                MEDIA_ROOT=media_root,
+                INGREDIENT_CATALOG_PATH=os.path.join(media_root, "ingredients.catalog"),
+            ):
+                results = self.run_benchmarks(options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            shutil.rmtree(media_root, ignore_errors=True)
+        if options["save"]:
+            self.save_baseline(options, results)
+        else:
+            self.compare(options, results)
+
+    def run_benchmarks(self, options):
+        user = seed_benchmark_data(options["seed"])
+        mismatches = check_parity(user)
+        if mismatches:
+            raise CommandError(
+                "Быстрые сериализаторы расходятся с DRF: " + ", ".join(mismatches)
+            )
+        results = {}
+        for name, function in get_benchmarks(user):
+            if options["filter"] in name:
+                results[name] = run_benchmark(function, options["repeat"])
+        if not results:
+            raise CommandError(f"Нет бенчмарков по фильтру: {options['filter']}")
+        return results
+
+    def load_baseline(self, options):
+        try:
+            with open(options["baseline"], encoding="utf-8") as baseline_file:
+                baseline = json.load(baseline_file)
+        except FileNotFoundError:
+            return {}
+        if baseline.get("seed") != options["seed"]:
+            self.stdout.write(
+                self.style.WARNING(
+                    "Базовые значения сняты на данных с другим зерном, "
+                    "сравнение пропущено."
+                )
+            )
+            return {}
+        return baseline["benchmarks"]
+
+    def save_baseline(self, options, results):
+        baseline = {"seed": options["seed"], "benchmarks": {}}
+        if os.path.exists(options["baseline"]):
+            with open(options["baseline"], encoding="utf-8") as baseline_file:
+                baseline = json.load(baseline_file)
+            if baseline.get("seed") != options["seed"]:
+                baseline = {"seed": options["seed"], "benchmarks": {}}
+        baseline["benchmarks"].update(results)
+        with open(options["baseline"], "w", encoding="utf-8") as baseline_file:
+            json.dump(baseline, baseline_file, ensure_ascii=False, indent=2)
+        self.write_table(results, {})
+        self.stdout.write(
+            self.style.SUCCESS(f"Базовые значения сохранены: {options['baseline']}")
+        )
+
+    def compare(self, options, results):
+        baseline = self.load_baseline(options)
+        slowdowns = self.write_table(results, baseline, options["tolerance"])
+        if slowdowns:
+            raise CommandError(
+                f"Замедление больше {options['tolerance']:.0%}: " + ", ".join(slowdowns)
+            )
+        if baseline:
+            self.stdout.write(self.style.SUCCESS("Замедлений нет."))
+
+    def write_table(self, results, baseline, tolerance=None):
+        slowdowns = []
+        self.stdout.write(
+            f"{'benchmark':<42}{'min, ms':>10}{'median, ms':>12}"
+            f"{'baseline, ms':>14}{'change':>9}"
+        )
+        for name, result in results.items():
+            line = f"{name:<42}{result['min_ms']:>10.3f}{result['median_ms']:>12.3f}"
+            if name not in baseline:
+                self.stdout.write(line)
+                continue
+            base = baseline[name]["min_ms"]
+            change = result["min_ms"] / base - 1 if base else 0
+            line += f"{base:>14.3f}{change:>+9.0%}"
+            if tolerance is not None and change > tolerance:
+                slowdowns.append(name)
+                self.stdout.write(self.style.ERROR(line))
+            else:
+                self.stdout.write(line)
+        return slowdowns
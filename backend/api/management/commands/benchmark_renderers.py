@@ -0,0 +1,88 @@
+import timeit
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import resolve
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory, force_authenticate
+from api.renderers import ORJSONRenderer, orjson
+from recipes.models import Recipe
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Сравнивает скорость JSONRenderer и ORJSONRenderer на ответах API."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--repeat", type=int, default=50, help="Количество повторов рендеринга."
+        )
+        parser.add_argument(
+            "--limit", type=int, default=100, help="Размер страницы списка рецептов."
+        )
+        parser.add_argument(
+            "--user", help="Email пользователя для эндпоинтов, требующих авторизации."
+        )
+
+    def get_endpoints(self, options):
+        endpoints = [
+            ("ingredients", "/api/ingredients/"),
+            ("recipes", f"/api/recipes/?limit={options['limit']}"),
+        ]
+        recipe = Recipe.objects.order_by("-pub_date").first()
+        if recipe is not None:
+            endpoints.append(("recipe detail", f"/api/recipes/{recipe.id}/"))
+        endpoints.append(
+            ("subscriptions", f"/api/users/subscriptions/?limit={options['limit']}")
+        )
+        return endpoints
+
+    def get_data(self, path, user):
+        request = APIRequestFactory().get(path)
+        if user is not None:
+            force_authenticate(request, user=user)
+        match = resolve(path.split("?")[0])
+        response = match.func(request, *match.args, **match.kwargs)
+        # Ответы, собранные без рендерера (снимок ингредиентов), пропускаются.
+        if response.status_code != 200 or not hasattr(response, "data"):
+            return None
+        return response.data
+
+    def handle(self, *args, **options):
+        if orjson is None:
+            raise CommandError("Библиотека orjson не установлена.")
+        user = None
+        if options["user"]:
+            user = User.objects.filter(email=options["user"]).first()
+            if user is None:
+                raise CommandError(f"Пользователь не найден: {options['user']}")
+        else:
+            user = User.objects.filter(follower__isnull=False).first()
+        renderers = (("json", JSONRenderer()), ("orjson", ORJSONRenderer()))
+        self.stdout.write(
+            f"{'endpoint':<16}{'size, KB':>10}{'json, ms':>12}"
+            f"{'orjson, ms':>12}{'speedup':>10}"
+        )
+        for name, path in self.get_endpoints(options):
+            data = self.get_data(path, user)
+            if data is None:
+                self.stdout.write(self.style.WARNING(f"{name:<16}пропущен"))
+                continue
+            timings = {}
+            for renderer_name, renderer in renderers:
+                rendered = renderer.render(data)
+                timings[renderer_name] = (
+                    min(
+                        timeit.repeat(
+                            lambda: renderer.render(data),
+                            number=1,
+                            repeat=options["repeat"],
+                        )
+                    )
+                    * 1000
+                )
+            self.stdout.write(
+                f"{name:<16}{len(rendered) / 1024:>10.1f}"
+                f"{timings['json']:>12.3f}{timings['orjson']:>12.3f}"
+                f"{timings['json'] / timings['orjson']:>9.1f}x"
+            )
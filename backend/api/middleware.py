@@ -0,0 +1,170 @@
+import re
+import zlib
+from contextlib import ExitStack
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.utils.cache import patch_vary_headers
+from .nplusone import detect_n_plus_one
+from .profiling import is_profiling_requested, is_staff_request, profile_request
+from .slow_queries import SlowQueryRecorder, get_view_name
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# HTML (админка, страницы DRF) не сжимается: в нем CSRF-токен рядом с
+# данными из запроса, и по размеру сжатого ответа его можно подобрать
+# (BREACH). События SSE тоже не сжимаются, чтобы доходить до клиента сразу.
+COMPRESSIBLE_CONTENT_TYPES = ("application/json", "application/x-ndjson")
+accept_encoding_re = re.compile(r"\s*([a-z*]+)\s*(?:;\s*q=([0-9.]+))?")
+
+
+def negotiate_encoding(accept_encoding):
+    weights = {}
+    for part in accept_encoding.lower().split(","):
+        match = accept_encoding_re.match(part)
+        if not match:
+            continue
+        try:
+            weights[match[1]] = float(match[2]) if match[2] else 1.0
+        except ValueError:
+            continue
+    supported = ("br", "gzip") if brotli is not None else ("gzip",)
+    candidates = [
+        (weights.get(encoding, weights.get("*", 0)), -index, encoding)
+        for index, encoding in enumerate(supported)
+    ]
+    weight, _, encoding = max(candidates)
+    return encoding if weight > 0 else None
+
+
+def compress(content, encoding):
+    if encoding == "br":
+        return brotli.compress(content, quality=settings.COMPRESSION_BROTLI_QUALITY)
+    compressor = zlib.compressobj(
+        settings.COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, zlib.MAX_WBITS | 16
+    )
+    return compressor.compress(content) + compressor.flush()
+
+
+def compress_stream(chunks, encoding):
+    if encoding == "br":
+        compressor = brotli.Compressor(quality=settings.COMPRESSION_BROTLI_QUALITY)
+        for chunk in chunks:
+            compressed = compressor.process(chunk) + compressor.flush()
+            if compressed:
+                yield compressed
+        yield compressor.finish()
+        return
+    compressor = zlib.compressobj(
+        settings.COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, zlib.MAX_WBITS | 16
+    )
+    for chunk in chunks:
+        compressed = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+class CompressionMiddleware:
+    # Ответ из кеша может выставить compression_cache_key, тогда сжатое
+    # тело кешируется рядом с ним и не пересчитывается на каждом попадании.
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        content_type = response.get("Content-Type", "").lower()
+        if not content_type.startswith(COMPRESSIBLE_CONTENT_TYPES):
+            return response
+        patch_vary_headers(response, ("Accept-Encoding",))
+        if response.has_header("Content-Encoding"):
+            return response
+        encoding = negotiate_encoding(request.META.get("HTTP_ACCEPT_ENCODING", ""))
+        if encoding is None:
+            return response
+        if response.streaming:
+            response.streaming_content = compress_stream(
+                response.streaming_content, encoding
+            )
+            del response["Content-Length"]
+        else:
+            if len(response.content) < settings.COMPRESSION_MIN_SIZE:
+                return response
+            compressed = self.get_compressed_content(response, encoding)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response["Content-Length"] = str(len(compressed))
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response["ETag"] = "W/" + etag
+        response["Content-Encoding"] = encoding
+        return response
+
+    def get_compressed_content(self, response, encoding):
+        cache_key = getattr(response, "compression_cache_key", None)
+        if cache_key is None:
+            return compress(response.content, encoding)
+        cache_key = f"{cache_key}:{encoding}"
+        compressed = cache.get(cache_key)
+        if compressed is None:
+            compressed = compress(response.content, encoding)
+            cache.set(
+                cache_key,
+                compressed,
+                getattr(response, "compression_cache_timeout", None),
+            )
+        return compressed
+
+
+class ProfilerMiddleware:
+    # Обычные запросы проходят без профилирования; проверка прав и
+    # аутентификация по токену выполняются только для запросов с X-Profile: 1
+    # или ?_profile=1.
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if is_profiling_requested(request) and is_staff_request(request):
+            return profile_request(request, self.get_response)
+        return self.get_response(request)
+
+
+class SlowQueryMiddleware:
+    # Пишет в журнал foodgram.slow_queries запросы к базе дольше
+    # SLOW_QUERY_THRESHOLD_MS вместе с представлением и вызвавшим кодом.
+
+    def __init__(self, get_response):
+        if settings.SLOW_QUERY_THRESHOLD_MS is None:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        recorder = SlowQueryRecorder(request, settings.SLOW_QUERY_THRESHOLD_MS)
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            return self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.slow_query_view = get_view_name(request, view_func)
+
+
+class NPlusOneMiddleware:
+    # Для разработки: предупреждает (или падает при NPLUSONE_ACTION = "raise"),
+    # если один шаблон SQL выполнен за запрос больше NPLUSONE_THRESHOLD раз.
+
+    def __init__(self, get_response):
+        if not settings.NPLUSONE_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with detect_n_plus_one(label=f"{request.method} {request.path}"):
+            return self.get_response(request)
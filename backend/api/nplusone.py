@@ -0,0 +1,86 @@
+import logging
+import sys
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+from django.conf import settings
+from django.db import connections
+from rest_framework.fields import Field
+from .slow_queries import get_calling_frame, get_fingerprint, normalize_sql
+
+logger = logging.getLogger("foodgram.nplusone")
+
+
+class NPlusOneError(Exception):
+    pass
+
+
+def get_serializer_field():
+    # Ближайшее к запросу поле сериализатора в стеке вызовов.
+    frame = sys._getframe(2)
+    while frame is not None:
+        field = frame.f_locals.get("self")
+        # type() вместо isinstance: isinstance вычисляет ленивые объекты
+        # вроде request.user и снова выполняет запрос.
+        if (
+            issubclass(type(field), Field)
+            and field.field_name
+            and getattr(field, "parent", None) is not None
+        ):
+            parent = field.parent
+            # Для many=True родитель поля — ListSerializer, нужен его child.
+            parent = getattr(parent, "child", None) or parent
+            return f"{type(parent).__name__}.{field.field_name}"
+        frame = frame.f_back
+    return None
+
+
+class QueryRepetitionDetector:
+
+    def __init__(self, threshold):
+        self.threshold = threshold
+        self.counts = Counter()
+        self.sources = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        normalized_sql = normalize_sql(sql)
+        fingerprint = get_fingerprint(normalized_sql)
+        self.counts[fingerprint] += 1
+        if fingerprint not in self.sources:
+            self.sources[fingerprint] = (
+                normalized_sql,
+                get_serializer_field(),
+                get_calling_frame(),
+            )
+        return execute(sql, params, many, context)
+
+    def get_repeated(self):
+        return [
+            (count, *self.sources[fingerprint])
+            for fingerprint, count in self.counts.most_common()
+            if count > self.threshold
+        ]
+
+    def check(self, action, label):
+        repeated = self.get_repeated()
+        if not repeated:
+            return
+        message = "\n".join(
+            f"{label}: запрос выполнен {count} раз "
+            f"(поле {field or '—'}, код {frame or '—'}): {sql[:500]}"
+            for count, sql, field, frame in repeated
+        )
+        if action == "raise":
+            raise NPlusOneError(message)
+        logger.warning(message)
+
+
+@contextmanager
+def detect_n_plus_one(threshold=None, action=None, label="N+1"):
+    detector = QueryRepetitionDetector(
+        settings.NPLUSONE_THRESHOLD if threshold is None else threshold
+    )
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(detector))
+        yield detector
+    detector.check(action or settings.NPLUSONE_ACTION, label)
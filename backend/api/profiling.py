@@ -0,0 +1,202 @@
+import cProfile
+import json
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.exceptions import AuthenticationFailed
+
+# Участки запроса, время которых берется из накопленной статистики cProfile:
+# (название, имя функции, окончание пути к файлу).
+SPANS = (
+    ("view", "dispatch", os.path.join("rest_framework", "views.py")),
+    ("authentication", "perform_authentication", "views.py"),
+    ("filter_queryset", "filter_queryset", "generics.py"),
+    # Включает и api/fast_serializers.py.
+    ("serializer", "data", "serializers.py"),
+    ("render", "rendered_content", "response.py"),
+)
+
+
+def is_profiling_requested(request):
+    return request.META.get("HTTP_X_PROFILE") == "1" or (
+        "_profile=" in request.META.get("QUERY_STRING", "")
+        and request.GET.get("_profile") == "1"
+    )
+
+
+def is_staff_request(request):
+    user = getattr(request, "user", None)
+    if user is not None and user.is_authenticated:
+        return user.is_staff
+    try:
+        result = TokenAuthentication().authenticate(request)
+    except AuthenticationFailed:
+        return False
+    return result is not None and result[0].is_staff
+
+
+def get_frame_name(frame):
+    code = frame.f_code
+    module = frame.f_globals.get("__name__", "?")
+    return f"{module}:{getattr(code, 'co_qualname', code.co_name)}"
+
+
+class StackSampler:
+    # Раз в interval секунд снимает стек потока запроса и копит его
+    # в формате «свернутых» стеков (frame;frame;frame count) для flamegraph.
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            names = []
+            while frame is not None:
+                names.append(get_frame_name(frame))
+                frame = frame.f_back
+            if names:
+                self.stacks[";".join(reversed(names))] += 1
+
+    def dump(self):
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.items())
+
+
+class SQLRecorder:
+
+    def __init__(self, started):
+        self.started = started
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            end = time.perf_counter()
+            self.queries.append(
+                {
+                    "alias": context["connection"].alias,
+                    "start_ms": round((start - self.started) * 1000, 3),
+                    "duration_ms": round((end - start) * 1000, 3),
+                    "sql": sql[:2000],
+                }
+            )
+
+
+def get_spans(profile):
+    stats = pstats.Stats(profile).stats
+    spans = {}
+    for span_name, function_name, path_suffix in SPANS:
+        durations = [
+            cumulative
+            for (filename, _, name), (_, _, _, cumulative, _) in stats.items()
+            if name == function_name and filename.endswith(path_suffix)
+        ]
+        if durations:
+            spans[span_name] = round(max(durations) * 1000, 3)
+    return spans
+
+
+def get_capture_name(request, started_at):
+    path = re.sub(r"[^A-Za-z0-9]+", "-", request.path).strip("-") or "root"
+    return f"{started_at:%Y%m%d-%H%M%S-%f}-{request.method.lower()}-{path[:60]}"
+
+
+def rotate_captures(directory, keep):
+    names = sorted(
+        name[: -len(".json")]
+        for name in os.listdir(directory)
+        if name.endswith(".json")
+    )
+    for name in names[: max(len(names) - keep, 0)]:
+        for extension in (".json", ".prof", ".folded"):
+            try:
+                os.remove(os.path.join(directory, name + extension))
+            except FileNotFoundError:
+                pass
+
+
+def profile_request(request, get_response):
+    started_at = timezone.now()
+    started = time.perf_counter()
+    profile = cProfile.Profile()
+    sampler = StackSampler(threading.get_ident(), settings.PROFILER_SAMPLE_INTERVAL)
+    recorder = SQLRecorder(started)
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(recorder))
+        sampler.start()
+        profile.enable()
+        try:
+            response = get_response(request)
+        finally:
+            profile.disable()
+            sampler.stop()
+    duration = time.perf_counter() - started
+    directory = str(settings.PROFILER_DIR)
+    os.makedirs(directory, exist_ok=True)
+    name = get_capture_name(request, started_at)
+    path = os.path.join(directory, name)
+    profile.dump_stats(f"{path}.prof")
+    with open(f"{path}.folded", "w", encoding="utf-8") as folded_file:
+        folded_file.write(sampler.dump())
+    spans = get_spans(profile)
+    spans["sql"] = round(sum(query["duration_ms"] for query in recorder.queries), 3)
+    with open(f"{path}.json", "w", encoding="utf-8") as meta_file:
+        json.dump(
+            {
+                "name": name,
+                "created_at": started_at.isoformat(),
+                "method": request.method,
+                "path": request.get_full_path(),
+                "status": response.status_code,
+                "duration_ms": round(duration * 1000, 3),
+                "samples": sum(sampler.stacks.values()),
+                "spans": spans,
+                "queries": recorder.queries,
+            },
+            meta_file,
+            ensure_ascii=False,
+        )
+    rotate_captures(directory, settings.PROFILER_MAX_CAPTURES)
+    response["X-Profile-Id"] = name
+    return response
+
+
+def list_captures():
+    directory = str(settings.PROFILER_DIR)
+    if not os.path.isdir(directory):
+        return []
+    captures = []
+    for file_name in sorted(os.listdir(directory), reverse=True):
+        if not file_name.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(directory, file_name), encoding="utf-8") as file:
+                capture = json.load(file)
+        except (OSError, ValueError):
+            continue
+        capture["query_count"] = len(capture.pop("queries", []))
+        captures.append(capture)
+    return captures
@@ -1,13 +1,18 @@
 from django.contrib.auth import get_user_model
+from django.db import transaction
 from rest_framework import serializers
+from recipes.changelog import record_changes
 from recipes.models import (
+    ChangeLogEntry,
     Ingredient,
     RecipeIngredient,
     Recipe,
     Favorite,
     ShoppingCart,
-    Follow,
+    ShoppingCartIngredient,
 )
+from recipes.nutrition import update_recipe_nutrition
+from recipes.similarity import update_recipe_similarity
 from .fields import Base64ImageField
 from djoser import serializers as djoser_serializers
 from recipes.constants import (
@@ -108,6 +113,17 @@ class IngredientSerializer(serializers.ModelSerializer):
         read_only_fields = fields
 
 
+class ShoppingCartIngredientSerializer(serializers.ModelSerializer):
+    id = serializers.ReadOnlyField(source="ingredient.id")
+    name = serializers.ReadOnlyField(source="ingredient.name")
+    measurement_unit = serializers.ReadOnlyField(source="ingredient.measurement_unit")
+
+    class Meta:
+        model = ShoppingCartIngredient
+        fields = ("id", "name", "measurement_unit", "total_amount")
+        read_only_fields = fields
+
+
 class RecipeIngredientReadSerializer(serializers.ModelSerializer):
     id = serializers.ReadOnlyField(source="ingredient.id")
     name = serializers.ReadOnlyField(source="ingredient.name")
@@ -139,6 +155,10 @@ class RecipeReadSerializer(serializers.ModelSerializer):
             "image",
             "text",
             "cooking_time",
+            "kcal",
+            "protein",
+            "fat",
+            "carbs",
         )
 
     def get_is_favorited(self, obj):
@@ -154,6 +174,12 @@ class RecipeReadSerializer(serializers.ModelSerializer):
         return False
 
 
+class RecipeDetailSerializer(RecipeReadSerializer):
+
+    class Meta(RecipeReadSerializer.Meta):
+        fields = RecipeReadSerializer.Meta.fields + ("views_count",)
+
+
 class RecipeMutationResponseSerializer(serializers.ModelSerializer):
     author = UserRecipeSerializer(read_only=True)
     ingredients = RecipeIngredientReadSerializer(
@@ -175,6 +201,10 @@ class RecipeMutationResponseSerializer(serializers.ModelSerializer):
             "image",
             "text",
             "cooking_time",
+            "kcal",
+            "protein",
+            "fat",
+            "carbs",
         )
 
     def get_is_favorited(self, obj):
@@ -191,7 +221,7 @@ class RecipeMutationResponseSerializer(serializers.ModelSerializer):
 
 
 class RecipeIngredientWriteSerializer(serializers.Serializer):
-    id = serializers.PrimaryKeyRelatedField(queryset=Ingredient.objects.all())
+    id = serializers.IntegerField()
     amount = serializers.IntegerField(
         min_value=MIN_INGREDIENT_AMOUNT, max_value=MAX_INGREDIENT_AMOUNT
     )
@@ -216,11 +246,20 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
             )
         ingredient_ids = set()
         for item in ingredients_data:
-            ingredient_id = item["id"].id
+            ingredient_id = item["id"]
             if ingredient_id in ingredient_ids:
                 raise serializers.ValidationError("Ингредиенты не должны повторяться.")
             ingredient_ids.add(ingredient_id)
-        return ingredients_data
+        ingredients = Ingredient.objects.in_bulk(ingredient_ids)
+        missing_ids = sorted(ingredient_ids - ingredients.keys())
+        if missing_ids:
+            raise serializers.ValidationError(
+                f"Ингредиенты не найдены: {', '.join(map(str, missing_ids))}."
+            )
+        return [
+            {"id": ingredients[item["id"]], "amount": item["amount"]}
+            for item in ingredients_data
+        ]
 
     def validate(self, attrs):
         if self.partial and "ingredients" not in self.initial_data:
@@ -230,25 +269,58 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
         return attrs
 
     def _create_or_update_ingredients(self, recipe, ingredients_data):
-        if recipe.ingredients.exists():
-            RecipeIngredient.objects.filter(recipe=recipe).delete()
-        recipe_ingredients_to_create = []
-        for ingredient_data in ingredients_data:
-            ingredient_obj = ingredient_data["id"]
-            amount = ingredient_data["amount"]
-            recipe_ingredients_to_create.append(
+        new_amounts = {item["id"].id: item["amount"] for item in ingredients_data}
+        with transaction.atomic():
+            current = {
+                recipe_ingredient.ingredient_id: recipe_ingredient
+                for recipe_ingredient in RecipeIngredient.objects.select_for_update()
+                .filter(recipe=recipe)
+                .order_by()
+            }
+            removed_ids = current.keys() - new_amounts.keys()
+            to_create = [
                 RecipeIngredient(
-                    recipe=recipe, ingredient=ingredient_obj, amount=amount
+                    recipe=recipe, ingredient_id=ingredient_id, amount=amount
                 )
-            )
-        RecipeIngredient.objects.bulk_create(recipe_ingredients_to_create)
-
+                for ingredient_id, amount in new_amounts.items()
+                if ingredient_id not in current
+            ]
+            to_update = []
+            deltas = {
+                ingredient_id: -current[ingredient_id].amount
+                for ingredient_id in removed_ids
+            }
+            for recipe_ingredient in to_create:
+                deltas[recipe_ingredient.ingredient_id] = recipe_ingredient.amount
+            for ingredient_id, recipe_ingredient in current.items():
+                amount = new_amounts.get(ingredient_id)
+                if amount is not None and amount != recipe_ingredient.amount:
+                    deltas[ingredient_id] = amount - recipe_ingredient.amount
+                    recipe_ingredient.amount = amount
+                    to_update.append(recipe_ingredient)
+            if removed_ids:
+                RecipeIngredient.objects.filter(
+                    recipe=recipe, ingredient_id__in=removed_ids
+                ).delete()
+            if to_update:
+                RecipeIngredient.objects.bulk_update(to_update, ["amount"])
+                record_changes(to_update, ChangeLogEntry.UPDATE)
+            if to_create:
+                RecipeIngredient.objects.bulk_create(to_create)
+                record_changes(to_create, ChangeLogEntry.CREATE)
+            ShoppingCartIngredient.objects.apply_recipe_deltas(recipe, deltas)
+            if deltas:
+                update_recipe_nutrition(recipe)
+                transaction.on_commit(lambda: update_recipe_similarity(recipe.id))
+
+    @transaction.atomic
     def create(self, validated_data):
         ingredients_data = validated_data.pop("ingredients")
         recipe = Recipe.objects.create(**validated_data)
         self._create_or_update_ingredients(recipe, ingredients_data)
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         ingredients_data = validated_data.pop("ingredients", None)
         instance.name = validated_data.get("name", instance.name)
@@ -258,7 +330,9 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
         )
         if "image" in validated_data:
             instance.image = validated_data.get("image", instance.image)
-        instance.save()
+        instance.save(
+            update_fields=["name", "text", "cooking_time", "image", "updated_at"]
+        )
         if ingredients_data is not None:
             self._create_or_update_ingredients(instance, ingredients_data)
         return instance
@@ -353,23 +427,9 @@ class ShortLinkSerializer(serializers.Serializer):
     short_link = serializers.CharField(source="short-link")
 
 
-class FollowCreateSerializer(serializers.ModelSerializer):
-    user = serializers.PrimaryKeyRelatedField(
-        queryset=User.objects.all(), default=serializers.CurrentUserDefault()
-    )
-    author = serializers.PrimaryKeyRelatedField(queryset=User.objects.all())
+class ChangeLogEntrySerializer(serializers.ModelSerializer):
 
     class Meta:
-        model = Follow
-        fields = ("user", "author")
-
-    def validate(self, data):
-        user = self.context["request"].user
-        author = data["author"]
-        if user == author:
-            raise serializers.ValidationError(
-                "Вы не можете подписаться на самого себя."
-            )
-        if user.follower.filter(author=author).exists():
-            raise serializers.ValidationError("Вы уже подписаны на этого пользователя.")
-        return data
+        model = ChangeLogEntry
+        fields = ("id", "model", "object_id", "action", "data", "created_at")
+        read_only_fields = fields
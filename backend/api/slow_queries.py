@@ -0,0 +1,149 @@
+import glob
+import hashlib
+import json
+import logging
+import os
+import re
+import sys
+import time
+from collections import Counter
+from django.conf import settings
+from django.utils import timezone
+
+logger = logging.getLogger("foodgram.slow_queries")
+
+string_re = re.compile(r"'(?:[^']|'')*'")
+number_re = re.compile(r"\b\d+(?:\.\d+)?\b")
+placeholder_re = re.compile(r"%s|\?")
+in_list_re = re.compile(r"\bIN \(\?(?:, \?)*\)", re.IGNORECASE)
+whitespace_re = re.compile(r"\s+")
+IGNORED_MODULES = (__name__, "api.middleware", "django.db", "contextlib")
+
+
+def normalize_sql(sql):
+    sql = string_re.sub("?", sql)
+    sql = number_re.sub("?", sql)
+    sql = placeholder_re.sub("?", sql)
+    sql = in_list_re.sub("IN (...)", sql)
+    return whitespace_re.sub(" ", sql).strip()
+
+
+def get_fingerprint(normalized_sql):
+    return hashlib.md5(normalized_sql.encode()).hexdigest()[:12]
+
+
+def get_view_name(request, view_func):
+    view_class = getattr(view_func, "cls", None)
+    if view_class is None:
+        return f"{view_func.__module__}.{view_func.__name__}"
+    method = request.method.lower()
+    actions = getattr(view_func, "actions", None) or {}
+    return f"{view_class.__name__}.{actions.get(method, method)}"
+
+
+def get_frame_name(frame):
+    code = frame.f_code
+    return (
+        f"{frame.f_globals.get('__name__', '?')}:"
+        f"{getattr(code, 'co_qualname', code.co_name)}:{frame.f_lineno}"
+    )
+
+
+def get_calling_frame():
+    # Первый кадр из кода проекта выше ORM: метод сериализатора, представление
+    # или команда, из-за которых выполнен запрос. Если запрос выполнен целиком
+    # внутри библиотеки (например, аутентификация DRF), берется ее кадр.
+    base_dir = str(settings.BASE_DIR) + os.sep
+    fallback = None
+    frame = sys._getframe(2)
+    while frame is not None:
+        module = frame.f_globals.get("__name__", "")
+        if not module.startswith(IGNORED_MODULES):
+            filename = frame.f_code.co_filename
+            if filename.startswith(base_dir) and "site-packages" not in filename:
+                return get_frame_name(frame)
+            if fallback is None:
+                fallback = frame
+        frame = frame.f_back
+    return get_frame_name(fallback) if fallback is not None else None
+
+
+class SlowQueryRecorder:
+
+    def __init__(self, request, threshold_ms):
+        self.request = request
+        self.threshold_ms = threshold_ms
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration_ms = (time.perf_counter() - start) * 1000
+            if duration_ms >= self.threshold_ms:
+                self.record(sql, many, context, duration_ms)
+
+    def record(self, sql, many, context, duration_ms):
+        normalized_sql = normalize_sql(sql)
+        # Параметры запроса в журнал не попадают.
+        logger.warning(
+            json.dumps(
+                {
+                    "time": timezone.now().isoformat(),
+                    "fingerprint": get_fingerprint(normalized_sql),
+                    "duration_ms": round(duration_ms, 3),
+                    "view": getattr(self.request, "slow_query_view", None),
+                    "method": self.request.method,
+                    "path": self.request.path,
+                    "frame": get_calling_frame(),
+                    "alias": context["connection"].alias,
+                    "many": many,
+                    "sql": normalized_sql[:2000],
+                },
+                ensure_ascii=False,
+            )
+        )
+
+
+def read_slow_queries():
+    path = str(settings.SLOW_QUERY_LOG_PATH)
+    for log_path in sorted(glob.glob(glob.escape(path) + "*")):
+        try:
+            with open(log_path, encoding="utf-8") as log_file:
+                for line in log_file:
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        continue
+        except OSError:
+            continue
+
+
+def group_slow_queries(limit=200):
+    groups = {}
+    for entry in read_slow_queries():
+        group = groups.get(entry["fingerprint"])
+        if group is None:
+            group = groups[entry["fingerprint"]] = {
+                "fingerprint": entry["fingerprint"],
+                "sql": entry["sql"],
+                "count": 0,
+                "total_ms": 0.0,
+                "max_ms": 0.0,
+                "last_seen": entry["time"],
+                "views": Counter(),
+                "frames": Counter(),
+            }
+        group["count"] += 1
+        group["total_ms"] += entry["duration_ms"]
+        group["max_ms"] = max(group["max_ms"], entry["duration_ms"])
+        group["last_seen"] = max(group["last_seen"], entry["time"])
+        group["views"][entry["view"] or entry["path"]] += 1
+        group["frames"][entry["frame"] or "—"] += 1
+    result = sorted(groups.values(), key=lambda group: -group["total_ms"])[:limit]
+    for group in result:
+        group["total_ms"] = round(group["total_ms"], 3)
+        group["avg_ms"] = round(group["total_ms"] / group["count"], 3)
+        group["views"] = group["views"].most_common(5)
+        group["frames"] = group["frames"].most_common(5)
+    return result
@@ -0,0 +1,19 @@
+from contextlib import contextmanager
+from .nplusone import NPlusOneError, detect_n_plus_one
+
+
+class NPlusOneTestMixin:
+    # Для TestCase: with self.assertNoNPlusOne(): self.client.get(...)
+    nplusone_threshold = None
+
+    @contextmanager
+    def assertNoNPlusOne(self, threshold=None):
+        try:
+            with detect_n_plus_one(
+                threshold if threshold is not None else self.nplusone_threshold,
+                action="raise",
+                label=self.id(),
+            ) as detector:
+                yield detector
+        except NPlusOneError as error:
+            raise self.failureException(str(error)) from None
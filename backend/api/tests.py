@@ -0,0 +1,248 @@
+import re
+from unittest import mock
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.test import TestCase, override_settings
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+from django.db.models import Sum
+from recipes.counters import flush_all
+from recipes.deletion import purge_deleted
+from recipes.models import (
+    Favorite,
+    Follow,
+    Ingredient,
+    Recipe,
+    RecipeIngredient,
+    ShoppingCart,
+    ShoppingCartIngredient,
+)
+from .fast_serializers import FastFollowSerializer, FastRecipeListSerializer
+from .serializers import FollowSerializer, RecipeReadSerializer
+from .testing import NPlusOneTestMixin
+
+User = get_user_model()
+
+
+class RecipeDataMixin:
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email="reader@example.com",
+            username="reader",
+            first_name="Читатель",
+            last_name="Читателев",
+            password="password",
+        )
+        authors = [
+            User.objects.create_user(
+                email=f"author{number}@example.com",
+                username=f"author{number}",
+                first_name=f"Автор{number}",
+                last_name=f"Авторов{number}",
+                password="password",
+                avatar=f"users/avatars/{number}.png" if number % 2 else "",
+            )
+            for number in range(3)
+        ]
+        ingredients = [
+            Ingredient.objects.create(name=name, measurement_unit="г")
+            for name in ("соль", "мука", "яйца", "сахар")
+        ]
+        for number in range(9):
+            recipe = Recipe.objects.create(
+                author=authors[number % 3],
+                name=f"Рецепт {number}",
+                image=f"recipes/images/{number}.png",
+                text="Описание",
+                cooking_time=number + 1,
+            )
+            for ingredient in ingredients[: number % 4 + 1]:
+                RecipeIngredient.objects.create(
+                    recipe=recipe, ingredient=ingredient, amount=number + 10
+                )
+            if number % 2:
+                Favorite.objects.create(user=cls.user, recipe=recipe)
+            if number % 3 == 0:
+                ShoppingCart.objects.create(user=cls.user, recipe=recipe)
+        for author in authors[:2]:
+            Follow.objects.create(user=cls.user, author=author)
+
+
+class FastSerializerParityTest(RecipeDataMixin, TestCase):
+    # Быстрые сериализаторы должны отдавать байт в байт то же, что и DRF.
+
+    def get_request(self, user, query=""):
+        request = Request(APIRequestFactory().get(f"/api/{query}"))
+        request.user = user or AnonymousUser()
+        return request
+
+    def assertSameOutput(self, expected, actual):
+        renderer = JSONRenderer()
+        self.assertEqual(renderer.render(expected), renderer.render(actual))
+
+    def test_recipe_list(self):
+        for user in (None, self.user):
+            with self.subTest(user=user):
+                context = {"request": self.get_request(user)}
+                queryset = Recipe.objects.order_by("-pub_date", "-id")
+                self.assertSameOutput(
+                    RecipeReadSerializer(queryset, many=True, context=context).data,
+                    FastRecipeListSerializer(
+                        queryset.values(*FastRecipeListSerializer.values_fields),
+                        context=context,
+                    ).data,
+                )
+
+    def test_subscriptions(self):
+        authors = User.objects.filter(following__user=self.user).order_by("id")
+        for recipes_limit in (0, 3):
+            with self.subTest(recipes_limit=recipes_limit):
+                context = {
+                    "request": self.get_request(
+                        self.user, f"?recipes_limit={recipes_limit}"
+                    )
+                }
+                self.assertSameOutput(
+                    FollowSerializer(authors, many=True, context=context).data,
+                    FastFollowSerializer(
+                        authors.values(*FastFollowSerializer.values_fields),
+                        context=context,
+                    ).data,
+                )
+
+
+class NPlusOneTest(RecipeDataMixin, NPlusOneTestMixin, TestCase):
+    nplusone_threshold = 3
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_recipe_list(self):
+        with self.assertNoNPlusOne():
+            response = self.client.get("/api/recipes/")
+        self.assertEqual(response.status_code, 200)
+
+    def test_subscriptions(self):
+        with self.assertNoNPlusOne():
+            response = self.client.get("/api/users/subscriptions/?recipes_limit=3")
+        self.assertEqual(response.status_code, 200)
+
+    def test_detects_repeated_queries(self):
+        with self.assertRaises(self.failureException):
+            with self.assertNoNPlusOne():
+                for recipe in Recipe.objects.all():
+                    recipe.author.username
+
+
+@override_settings(
+    CACHES={
+        "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+        "shared": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+    }
+)
+class CoalesceTest(RecipeDataMixin, TestCase):
+
+    def tearDown(self):
+        # Просмотры сохраняются, пока тестовая база еще существует.
+        flush_all()
+
+    def get_csrf_token(self, url):
+        response = APIClient().get(url, HTTP_ACCEPT="text/html")
+        self.assertEqual(response.status_code, 200)
+        return re.search(r'"csrfToken": "([^"]*)"', response.content.decode())[1]
+
+    def test_html_not_shared_between_clients(self):
+        url = f"/api/recipes/{Recipe.objects.first().id}/"
+        first, second = self.get_csrf_token(url), self.get_csrf_token(url)
+        self.assertTrue(first)
+        self.assertNotEqual(first, second)
+
+    def test_json_shared_between_clients(self):
+        url = "/api/recipes/"
+        first = APIClient().get(url)
+        Recipe.objects.update(name="Изменено без журнала")
+        second = APIClient().get(url)
+        self.assertEqual(first.content, second.content)
+
+
+class SoftDeleteTest(RecipeDataMixin, TestCase):
+
+    def assertCartSummaryMatchesCart(self):
+        expected = dict(
+            RecipeIngredient.objects.filter(
+                recipe__in_shopping_cart_of__user=self.user,
+                recipe__deleted_at__isnull=True,
+            )
+            .values("ingredient_id")
+            .annotate(total=Sum("amount"))
+            .values_list("ingredient_id", "total")
+        )
+        self.assertEqual(
+            dict(
+                ShoppingCartIngredient.objects.filter(user=self.user).values_list(
+                    "ingredient_id", "total_amount"
+                )
+            ),
+            expected,
+        )
+
+    def test_deleted_recipe_leaves_cart_summary(self):
+        recipe = Recipe.objects.filter(in_shopping_cart_of__user=self.user).first()
+        client = APIClient()
+        client.force_authenticate(recipe.author)
+        response = client.delete(f"/api/recipes/{recipe.id}/")
+        self.assertEqual(response.status_code, 204)
+        self.assertCartSummaryMatchesCart()
+        purge_deleted()
+        self.assertFalse(Recipe.all_objects.filter(pk=recipe.id).exists())
+        self.assertCartSummaryMatchesCart()
+
+
+class ShoppingCartSummaryTest(RecipeDataMixin, TestCase):
+
+    def get_summary(self):
+        return dict(
+            ShoppingCartIngredient.objects.filter(user=self.user).values_list(
+                "ingredient_id", "total_amount"
+            )
+        )
+
+    def test_overlapping_adds_and_removes(self):
+        first, second = Recipe.objects.exclude(in_shopping_cart_of__user=self.user)[:2]
+        before = self.get_summary()
+        manager = ShoppingCartIngredient.objects
+        manager.add_recipe(self.user.id, first.id)
+        manager.add_recipe(self.user.id, second.id)
+        manager.remove_recipe(self.user.id, first.id)
+        manager.add_recipe(self.user.id, first.id)
+        manager.remove_recipe(self.user.id, second.id)
+        expected = dict(before)
+        for ingredient_id, amount in first.recipeingredients.values_list(
+            "ingredient_id", "amount"
+        ):
+            expected[ingredient_id] = expected.get(ingredient_id, 0) + amount
+        self.assertEqual(self.get_summary(), expected)
+
+    def test_row_inserted_concurrently(self):
+        recipe = Recipe.objects.exclude(in_shopping_cart_of__user=self.user).first()
+        ShoppingCartIngredient.objects.filter(user=self.user).delete()
+        amounts = dict(recipe.recipeingredients.values_list("ingredient_id", "amount"))
+        ingredient_id = next(iter(amounts))
+        manager = ShoppingCartIngredient.objects
+        bulk_create = manager.bulk_create
+
+        def bulk_create_after_concurrent_add(objs, **kwargs):
+            # Строку для той же пары успела вставить параллельная транзакция.
+            manager.create(user=self.user, ingredient_id=ingredient_id, total_amount=1)
+            return bulk_create(objs, **kwargs)
+
+        with mock.patch.object(
+            manager, "bulk_create", side_effect=bulk_create_after_concurrent_add
+        ):
+            manager.add_recipe(self.user.id, recipe.id)
+        amounts[ingredient_id] += 1
+        self.assertEqual(self.get_summary(), amounts)
@@ -1,12 +1,21 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import IngredientViewSet, RecipeViewSet, UserAvatarView, CustomUserViewSet
+from .views import (
+    ChangeFeedView,
+    ChangeStreamView,
+    CustomUserViewSet,
+    IngredientViewSet,
+    RecipeViewSet,
+    UserAvatarView,
+)
 
 router = DefaultRouter()
 router.register("ingredients", IngredientViewSet, basename="ingredients")
 router.register("recipes", RecipeViewSet, basename="recipes")
 router.register("users", CustomUserViewSet, basename="custom-user")
 urlpatterns = [
-    path("users/me/avatar/", UserAvatarView.as_view(), name="user-me-avatar")
+    path("users/me/avatar/", UserAvatarView.as_view(), name="user-me-avatar"),
+    path("changes/", ChangeFeedView.as_view(), name="changes"),
+    path("changes/stream/", ChangeStreamView.as_view(), name="changes-stream"),
 ]
 urlpatterns += router.urls
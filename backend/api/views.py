@@ -1,41 +1,71 @@
+import json
+import threading
+import time
+from urllib.parse import urlencode
 from django.shortcuts import render, get_object_or_404
 from rest_framework import viewsets, filters
 from recipes.models import (
     Ingredient,
     Recipe,
-    RecipeIngredient,
     Follow,
     Favorite,
     ShoppingCart,
+    ShoppingCartIngredient,
 )
 from .serializers import (
+    ChangeLogEntrySerializer,
     IngredientSerializer,
+    ShoppingCartIngredientSerializer,
     RecipeReadSerializer,
+    RecipeDetailSerializer,
     RecipeWriteSerializer,
     FollowSerializer,
     RecipeInFollowSerializer,
     CustomCurrentUserSerializer,
     UserAvatarSerializer,
     CustomUserCreateSerializer,
-    FollowCreateSerializer,
     UserAvatarResponseSerializer,
 )
 from rest_framework import permissions, status
 from rest_framework.response import Response
+from .coalescing import coalesce
+from .parsers import ORJSONParser
 from .permissions import IsAuthorOrAdminOrReadOnly
+from .fast_serializers import FastFollowSerializer, FastRecipeListSerializer
 from django_filters.rest_framework import DjangoFilterBackend
-from .filters import RecipeFilter
+from .filters import RecipeFilter, RecipeOrderingFilter
 from djoser import views as djoser_views
 from django.contrib.auth import get_user_model
 from rest_framework.decorators import action
-from django.db import IntegrityError
-from django.http import HttpResponse
-from django.db.models import Sum
-from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
+from django.db import IntegrityError, transaction
+from django.http import (
+    Http404,
+    HttpResponse,
+    HttpResponseRedirect,
+    StreamingHttpResponse,
+)
+from rest_framework.parsers import MultiPartParser, FormParser
 from django.conf import settings
 from rest_framework.pagination import PageNumberPagination
 from rest_framework.views import APIView
 from rest_framework import serializers
+from recipes.export import gzip_stream, iter_recipes_ndjson, parse_since
+from recipes.importer import RecipeImporter
+from recipes.feed import decode_cursor, get_feed_page
+from recipes.trending import get_trending_ids
+from recipes.catalog import get_catalog_snapshot
+from recipes.changelog import read_changes, wait_for_changes
+from recipes.deletion import soft_delete_recipes, soft_delete_user
+from recipes.constants import (
+    CHANGELOG_BATCH_SIZE,
+    CHANGELOG_KEEPALIVE_INTERVAL,
+    CHANGELOG_LONG_POLL_TIMEOUT,
+    CHANGELOG_MAX_WAITERS,
+    CHANGELOG_STREAM_TIMEOUT,
+    FEED_MAX_PAGE_SIZE,
+)
+from recipes.counters import recipe_views, short_link_clicks
+from recipes.shortlinks import encode_short_code, recipe_exists, resolve_short_code
 
 User = get_user_model()
 
@@ -49,6 +79,19 @@ class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
     permission_classes = []
     pagination_class = None
 
+    def list(self, request, *args, **kwargs):
+        snapshot = get_catalog_snapshot()
+        if snapshot is None:
+            return super().list(request, *args, **kwargs)
+        search_name = request.query_params.get("name")
+        if search_name:
+            return HttpResponse(
+                snapshot.search(search_name), content_type="application/json"
+            )
+        response = HttpResponse(snapshot.body, content_type="application/json")
+        response.compression_cache_key = f"ingredients:{snapshot.build_id}"
+        return response
+
     def get_queryset(self):
         queryset = Ingredient.objects.all()
         search_name = self.request.query_params.get("name", None)
@@ -63,19 +106,54 @@ class RecipeViewSet(viewsets.ModelViewSet):
     filter_backends = (
         DjangoFilterBackend,
         filters.SearchFilter,
-        filters.OrderingFilter,
+        RecipeOrderingFilter,
     )
     filterset_class = RecipeFilter
+    ordering_fields = (
+        "id",
+        "name",
+        "text",
+        "cooking_time",
+        "pub_date",
+        "trending",
+        "views",
+    )
     pagination_class = RecipePagination
 
     def get_serializer_class(self):
-        if self.action in ("list", "retrieve"):
+        if self.action == "list":
             return RecipeReadSerializer
+        if self.action == "retrieve":
+            return RecipeDetailSerializer
         return RecipeWriteSerializer
 
+    def list(self, request, *args, **kwargs):
+        return coalesce(self, request, self.list_recipes, *args, **kwargs)
+
+    def list_recipes(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset()).values(
+            *FastRecipeListSerializer.values_fields
+        )
+        page = self.paginate_queryset(queryset)
+        context = self.get_serializer_context()
+        if page is not None:
+            serializer = FastRecipeListSerializer(page, context=context)
+            return self.get_paginated_response(serializer.data)
+        serializer = FastRecipeListSerializer(queryset, context=context)
+        return Response(serializer.data)
+
+    def retrieve(self, request, *args, **kwargs):
+        response = coalesce(self, request, super().retrieve, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            recipe_views.increment(int(kwargs["pk"]))
+        return response
+
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
+    def perform_destroy(self, instance):
+        soft_delete_recipes([instance.pk])
+
     @action(
         detail=True,
         methods=["get"],
@@ -83,8 +161,15 @@ class RecipeViewSet(viewsets.ModelViewSet):
         url_path="get-link",
     )
     def get_short_link(self, request, pk=None):
-        recipe = get_object_or_404(Recipe, pk=pk)
-        short_link_value = f"{request.scheme}://{request.get_host()}/r/{recipe.id}"
+        try:
+            recipe_id = int(pk)
+        except ValueError:
+            raise Http404
+        if not recipe_exists(recipe_id):
+            raise Http404
+        short_link_value = (
+            f"{request.scheme}://{request.get_host()}/s/{encode_short_code(recipe_id)}"
+        )
         return Response({"short-link": short_link_value}, status=status.HTTP_200_OK)
 
     @action(
@@ -93,23 +178,13 @@ class RecipeViewSet(viewsets.ModelViewSet):
         permission_classes=[permissions.IsAuthenticated],
     )
     def favorite(self, request, pk=None):
-        recipe = get_object_or_404(Recipe, pk=pk)
-        current_user = request.user
-        if request.method == "POST":
-            if current_user.favorites.filter(recipe=recipe).exists():
-                raise serializers.ValidationError("Рецепт уже в избранном.")
-            Favorite.objects.create(user=current_user, recipe=recipe)
-            serializer = RecipeInFollowSerializer(recipe, context={"request": request})
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
-        elif request.method == "DELETE":
-            favorite_instance = current_user.favorites.filter(recipe=recipe).first()
-            if not favorite_instance:
-                raise serializers.ValidationError(
-                    "Этого рецепта нет в вашем избранном."
-                )
-            favorite_instance.delete()
-            return Response(status=status.HTTP_204_NO_CONTENT)
-        return Response(status=status.HTTP_405_METHOD_NOT_ALLOWED)
+        return self.toggle_relation(
+            request,
+            pk,
+            Favorite,
+            "Рецепт уже в избранном.",
+            "Этого рецепта нет в вашем избранном.",
+        )
 
     @action(
         detail=True,
@@ -117,23 +192,34 @@ class RecipeViewSet(viewsets.ModelViewSet):
         permission_classes=[permissions.IsAuthenticated],
     )
     def shopping_cart(self, request, pk=None):
-        recipe = get_object_or_404(Recipe, pk=pk)
-        current_user = request.user
+        return self.toggle_relation(
+            request,
+            pk,
+            ShoppingCart,
+            "Рецепт уже в списке покупок.",
+            "Этого рецепта нет в вашем списке покупок.",
+        )
+
+    def toggle_relation(self, request, pk, model, exists_message, missing_message):
+        # Повторное добавление отсекает уникальное ограничение (user, recipe),
+        # без предварительной проверки и гонки между ней и INSERT. Удаление
+        # не одним DELETE: из-за обработчиков pre_delete/post_delete (сводка
+        # списка покупок, журнал изменений) Django сначала выбирает строку,
+        # а затем удаляет ее по id; проверка существования все равно не нужна.
         if request.method == "POST":
-            if current_user.shopping_cart.filter(recipe=recipe).exists():
-                raise serializers.ValidationError("Рецепт уже в списке покупок.")
-            ShoppingCart.objects.create(user=current_user, recipe=recipe)
+            recipe = get_object_or_404(Recipe, pk=pk)
+            try:
+                with transaction.atomic():
+                    model.objects.create(user=request.user, recipe=recipe)
+            except IntegrityError:
+                raise serializers.ValidationError(exists_message)
             serializer = RecipeInFollowSerializer(recipe, context={"request": request})
             return Response(serializer.data, status=status.HTTP_201_CREATED)
-        elif request.method == "DELETE":
-            cart_item = current_user.shopping_cart.filter(recipe=recipe).first()
-            if not cart_item:
-                raise serializers.ValidationError(
-                    "Этого рецепта нет в вашем списке покупок."
-                )
-            cart_item.delete()
-            return Response(status=status.HTTP_204_NO_CONTENT)
-        return Response(status=status.HTTP_405_METHOD_NOT_ALLOWED)
+        deleted, _ = model.objects.filter(user=request.user, recipe_id=pk).delete()
+        if not deleted:
+            get_object_or_404(Recipe, pk=pk)
+            raise serializers.ValidationError(missing_message)
+        return Response(status=status.HTTP_204_NO_CONTENT)
 
     @action(
         detail=False, methods=["get"], permission_classes=[permissions.IsAuthenticated]
@@ -141,11 +227,8 @@ class RecipeViewSet(viewsets.ModelViewSet):
     def download_shopping_cart(self, request):
         current_user = request.user
         ingredients_summary = (
-            RecipeIngredient.objects.filter(
-                recipe__in_shopping_cart_of__user=current_user
-            )
-            .values("ingredient__name", "ingredient__measurement_unit")
-            .annotate(total_amount=Sum("amount"))
+            ShoppingCartIngredient.objects.filter(user=current_user)
+            .values("ingredient__name", "ingredient__measurement_unit", "total_amount")
             .order_by("ingredient__name")
         )
         if not ingredients_summary:
@@ -166,6 +249,130 @@ class RecipeViewSet(viewsets.ModelViewSet):
         response["Content-Disposition"] = 'attachment; filename="shopping_list.txt"'
         return response
 
+    @action(detail=False, methods=["get"], permission_classes=[permissions.IsAdminUser])
+    def export(self, request):
+        since = request.query_params.get("since")
+        if since:
+            try:
+                since = parse_since(since)
+            except ValueError as error:
+                raise serializers.ValidationError({"since": [str(error)]})
+        chunks = iter_recipes_ndjson(since=since or None)
+        filename = "recipes.ndjson"
+        content_type = "application/x-ndjson"
+        if request.query_params.get("gzip") in ("1", "true"):
+            chunks = gzip_stream(chunks)
+            filename += ".gz"
+            content_type = "application/gzip"
+        response = StreamingHttpResponse(chunks, content_type=content_type)
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+        return response
+
+    @action(
+        detail=False,
+        methods=["post"],
+        permission_classes=[permissions.IsAdminUser],
+        url_path="import",
+    )
+    def import_recipes(self, request):
+        importer = RecipeImporter(default_author=request.user)
+        importer.run(request.stream or [])
+        errors = [
+            {"line": line_number, "error": error}
+            for line_number, error in sorted(importer.errors)
+        ]
+        return Response(
+            {"imported": importer.imported, "errors": errors},
+            status=(
+                status.HTTP_201_CREATED
+                if importer.imported
+                else status.HTTP_400_BAD_REQUEST
+            ),
+        )
+
+    @action(detail=True, methods=["get"], permission_classes=[permissions.AllowAny])
+    def similar(self, request, pk=None):
+        recipe = self.get_object()
+        similar_recipes = [
+            similarity.similar
+            for similarity in recipe.similarities.filter(
+                similar__deleted_at__isnull=True
+            )
+            .select_related("similar")
+            .order_by("-score", "similar_id")
+        ]
+        serializer = RecipeInFollowSerializer(
+            similar_recipes, many=True, context={"request": request}
+        )
+        return Response(serializer.data)
+
+    @action(detail=False, methods=["get"], permission_classes=[permissions.AllowAny])
+    def trending(self, request):
+        recipe_ids = get_trending_ids()
+        recipes = (
+            Recipe.objects.filter(id__in=recipe_ids)
+            .select_related("author")
+            .prefetch_related("recipeingredients__ingredient")
+            .in_bulk()
+        )
+        serializer = RecipeReadSerializer(
+            [recipes[recipe_id] for recipe_id in recipe_ids if recipe_id in recipes],
+            many=True,
+            context={"request": request},
+        )
+        return Response(serializer.data)
+
+    @action(
+        detail=False, methods=["get"], permission_classes=[permissions.IsAuthenticated]
+    )
+    def feed(self, request):
+        cursor = request.query_params.get("cursor")
+        if cursor:
+            try:
+                cursor = decode_cursor(cursor)
+            except ValueError as error:
+                raise serializers.ValidationError({"cursor": [str(error)]})
+        try:
+            limit = int(
+                request.query_params.get("limit", settings.REST_FRAMEWORK["PAGE_SIZE"])
+            )
+        except ValueError:
+            limit = settings.REST_FRAMEWORK["PAGE_SIZE"]
+        limit = min(max(limit, 1), FEED_MAX_PAGE_SIZE)
+        recipe_ids, next_cursor = get_feed_page(request.user, limit, cursor or None)
+        recipes = (
+            Recipe.objects.filter(id__in=recipe_ids)
+            .select_related("author")
+            .prefetch_related("recipeingredients__ingredient")
+            .in_bulk()
+        )
+        serializer = RecipeReadSerializer(
+            [recipes[recipe_id] for recipe_id in recipe_ids if recipe_id in recipes],
+            many=True,
+            context={"request": request},
+        )
+        next_url = None
+        if next_cursor:
+            next_url = request.build_absolute_uri(
+                f"{request.path}?{urlencode({'cursor': next_cursor, 'limit': limit})}"
+            )
+        return Response({"next": next_url, "results": serializer.data})
+
+    @action(
+        detail=False,
+        methods=["get"],
+        permission_classes=[permissions.IsAuthenticated],
+        url_path="shopping_cart/summary",
+    )
+    def shopping_cart_summary(self, request):
+        summary = (
+            ShoppingCartIngredient.objects.filter(user=request.user)
+            .select_related("ingredient")
+            .order_by("ingredient__name")
+        )
+        serializer = ShoppingCartIngredientSerializer(summary, many=True)
+        return Response(serializer.data)
+
 
 class CustomUserViewSet(djoser_views.UserViewSet):
     queryset = User.objects.all()
@@ -175,6 +382,18 @@ class CustomUserViewSet(djoser_views.UserViewSet):
             return CustomUserCreateSerializer
         return super().get_serializer_class()
 
+    def dispatch(self, request, *args, **kwargs):
+        # Действия djoser (регистрация, смена пароля, имени и т. п.) сохраняют
+        # пользователя вне транзакции; запись журнала изменений должна
+        # фиксироваться вместе с самим изменением.
+        if request.method in permissions.SAFE_METHODS:
+            return super().dispatch(request, *args, **kwargs)
+        with transaction.atomic():
+            return super().dispatch(request, *args, **kwargs)
+
+    def perform_destroy(self, instance):
+        soft_delete_user(instance)
+
     @action(
         methods=["get", "put", "patch", "delete"],
         detail=False,
@@ -199,28 +418,30 @@ class CustomUserViewSet(djoser_views.UserViewSet):
         permission_classes=[permissions.IsAuthenticated],
     )
     def subscribe(self, request, id=None):
-        user_to_follow = get_object_or_404(User, id=id)
+        current_user = request.user
         if request.method == "POST":
-            serializer = FollowCreateSerializer(
-                data={"author": user_to_follow.id}, context={"request": request}
-            )
-            serializer.is_valid(raise_exception=True)
-            serializer.save()
+            user_to_follow = get_object_or_404(User, id=id)
+            if user_to_follow == current_user:
+                raise serializers.ValidationError(
+                    {"non_field_errors": ["Вы не можете подписаться на самого себя."]}
+                )
+            try:
+                with transaction.atomic():
+                    Follow.objects.create(user=current_user, author=user_to_follow)
+            except IntegrityError:
+                raise serializers.ValidationError(
+                    {"non_field_errors": ["Вы уже подписаны на этого пользователя."]}
+                )
             response_serializer = FollowSerializer(
                 user_to_follow, context={"request": request}
             )
             return Response(response_serializer.data, status=status.HTTP_201_CREATED)
-        elif request.method == "DELETE":
-            current_user = request.user
-            follow_instance = current_user.follower.filter(
-                author=user_to_follow
-            ).first()
-            if not follow_instance:
-                raise serializers.ValidationError(
-                    "Вы не подписаны на этого пользователя."
-                )
-            follow_instance.delete()
-            return Response(status=status.HTTP_204_NO_CONTENT)
+        # SELECT и DELETE по id: обработчики удаления Follow чистят ленту.
+        deleted, _ = current_user.follower.filter(author_id=id).delete()
+        if not deleted:
+            get_object_or_404(User, id=id)
+            raise serializers.ValidationError("Вы не подписаны на этого пользователя.")
+        return Response(status=status.HTTP_204_NO_CONTENT)
 
     @action(
         detail=False, methods=["get"], permission_classes=[permissions.IsAuthenticated]
@@ -232,26 +453,27 @@ class CustomUserViewSet(djoser_views.UserViewSet):
         paginator.page_size = request.query_params.get(
             "limit", settings.REST_FRAMEWORK.get("PAGE_SIZE")
         )
-        page = paginator.paginate_queryset(subscribed_authors, request)
-        serializer = FollowSerializer(page, many=True, context={"request": request})
+        page = paginator.paginate_queryset(
+            subscribed_authors.values(*FastFollowSerializer.values_fields), request
+        )
+        serializer = FastFollowSerializer(page, context={"request": request})
         return paginator.get_paginated_response(serializer.data)
 
 
 class UserAvatarView(APIView):
     permission_classes = [permissions.IsAuthenticated]
-    parser_classes = [JSONParser, MultiPartParser, FormParser]
+    parser_classes = [ORJSONParser, MultiPartParser, FormParser]
 
     def get(self, request, *args, **kwargs):
         user = request.user
         serializer = UserAvatarResponseSerializer(user, context={"request": request})
         return Response(serializer.data)
 
+    @transaction.atomic
     def put(self, request, *args, **kwargs):
         user = request.user
         serializer = UserAvatarSerializer(data=request.data)
         if serializer.is_valid():
-            if user.avatar and hasattr(user.avatar, "delete"):
-                user.avatar.delete(save=False)
             user.avatar = serializer.validated_data["avatar"]
             user.save(update_fields=["avatar"])
             response_serializer = UserAvatarResponseSerializer(
@@ -260,10 +482,10 @@ class UserAvatarView(APIView):
             return Response(response_serializer.data, status=status.HTTP_200_OK)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    @transaction.atomic
     def delete(self, request, *args, **kwargs):
         user = request.user
-        if user.avatar and hasattr(user.avatar, "delete"):
-            user.avatar.delete(save=False)
+        if user.avatar:
             user.avatar = None
             user.save(update_fields=["avatar"])
             return Response(status=status.HTTP_204_NO_CONTENT)
@@ -271,3 +493,112 @@ class UserAvatarView(APIView):
             {"detail": "У пользователя нет аватара для удаления."},
             status=status.HTTP_404_NOT_FOUND,
         )
+
+
+def get_int_param(request, name, default, max_value=None):
+    value = request.query_params.get(name)
+    if value in (None, ""):
+        return default
+    try:
+        value = int(value)
+    except ValueError:
+        raise serializers.ValidationError({name: ["Ожидается целое число."]})
+    if value < 0:
+        raise serializers.ValidationError({name: ["Ожидается неотрицательное число."]})
+    return min(value, max_value) if max_value is not None else value
+
+
+# Ожидание изменений занимает поток воркера, поэтому ждать одновременно
+# могут не больше CHANGELOG_MAX_WAITERS запросов на процесс; остальные сразу
+# получают то, что уже есть в журнале.
+change_waiters = threading.BoundedSemaphore(CHANGELOG_MAX_WAITERS)
+
+
+class ChangeFeedView(APIView):
+    # Long-poll: ответ приходит, как только в журнале появились записи
+    # после after, или через timeout секунд с пустым списком.
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request, *args, **kwargs):
+        after_id = get_int_param(request, "after", 0)
+        limit = get_int_param(
+            request, "limit", CHANGELOG_BATCH_SIZE, CHANGELOG_BATCH_SIZE
+        )
+        timeout = get_int_param(
+            request,
+            "timeout",
+            CHANGELOG_LONG_POLL_TIMEOUT,
+            CHANGELOG_LONG_POLL_TIMEOUT,
+        )
+        if change_waiters.acquire(blocking=False):
+            try:
+                entries = wait_for_changes(after_id, timeout, max(limit, 1))
+            finally:
+                change_waiters.release()
+        else:
+            entries = read_changes(after_id, max(limit, 1))
+        return Response(
+            {
+                "last_id": entries[-1].id if entries else after_id,
+                "results": ChangeLogEntrySerializer(entries, many=True).data,
+            }
+        )
+
+
+def format_change_events(entries):
+    for entry in ChangeLogEntrySerializer(entries, many=True).data:
+        yield (
+            f"id: {entry['id']}\nevent: change\n"
+            f"data: {json.dumps(entry, ensure_ascii=False)}\n\n"
+        )
+
+
+def iter_change_events(after_id):
+    if not change_waiters.acquire(blocking=False):
+        # Без ожидания: уже накопленные события и переподключение позже.
+        yield "retry: 5000\n\n"
+        yield from format_change_events(read_changes(after_id))
+        return
+    try:
+        deadline = time.monotonic() + CHANGELOG_STREAM_TIMEOUT
+        yield "retry: 1000\n\n"
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            entries = wait_for_changes(
+                after_id, min(CHANGELOG_KEEPALIVE_INTERVAL, remaining)
+            )
+            if not entries:
+                yield ": keepalive\n\n"
+                continue
+            yield from format_change_events(entries)
+            after_id = entries[-1].id
+    finally:
+        change_waiters.release()
+
+
+class ChangeStreamView(APIView):
+    # Server-Sent Events: соединение держится CHANGELOG_STREAM_TIMEOUT секунд,
+    # EventSource переподключается сам и передает Last-Event-ID.
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request, *args, **kwargs):
+        after_id = get_int_param(request, "after", None)
+        if after_id is None:
+            last_event_id = request.headers.get("Last-Event-ID", "")
+            after_id = int(last_event_id) if last_event_id.isdigit() else 0
+        response = StreamingHttpResponse(
+            iter_change_events(after_id), content_type="text/event-stream"
+        )
+        response["Cache-Control"] = "no-cache"
+        response["X-Accel-Buffering"] = "no"
+        return response
+
+
+def short_link_redirect(request, code):
+    recipe_id = resolve_short_code(code)
+    if recipe_id is None:
+        raise Http404
+    short_link_clicks.increment(recipe_id)
+    return HttpResponseRedirect(f"/recipes/{recipe_id}")
@@ -22,6 +22,7 @@ INSTALLED_APPS = [
 ]
 MIDDLEWARE = [
     "corsheaders.middleware.CorsMiddleware",
+    "api.middleware.CompressionMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -29,6 +30,9 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "api.middleware.NPlusOneMiddleware",
+    "api.middleware.SlowQueryMiddleware",
+    "api.middleware.ProfilerMiddleware",
 ]
 ROOT_URLCONF = "foodgram.urls"
 TEMPLATES = [
@@ -72,6 +76,15 @@ REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": [
         "rest_framework.authentication.TokenAuthentication"
     ],
+    "DEFAULT_RENDERER_CLASSES": [
+        "api.renderers.ORJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+    "DEFAULT_PARSER_CLASSES": [
+        "api.parsers.ORJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ],
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
     "PAGE_SIZE": 10,
     "PAGE_SIZE_QUERY_PARAM": "limit",
@@ -98,5 +111,56 @@ DJOSER = {
     },
     "VIEWS": {"user": "api.views.CustomUserViewSet"},
 }
+COMPRESSION_MIN_SIZE = 1024
+COMPRESSION_GZIP_LEVEL = 6
+COMPRESSION_BROTLI_QUALITY = 5
+STORAGES = {
+    "default": {"BACKEND": "foodgram.storage.ContentAddressedStorage"},
+    "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+}
+CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+    # Общий для всех воркеров кеш; в продакшене его стоит перевести на Redis.
+    "shared": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": BASE_DIR / "cache" / "shared",
+    },
+}
+SHARED_CACHE_ALIAS = "shared"
+COALESCE_LOCK_DIR = BASE_DIR / "cache" / "locks"
+PROFILER_DIR = BASE_DIR / "profiles"
+PROFILER_MAX_CAPTURES = 50
+PROFILER_SAMPLE_INTERVAL = 0.001
+SLOW_QUERY_THRESHOLD_MS = 100
+SLOW_QUERY_LOG_PATH = BASE_DIR / "slow_queries.log"
+NPLUSONE_ENABLED = DEBUG
+NPLUSONE_THRESHOLD = 5
+NPLUSONE_ACTION = "warn"
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "formatters": {"message": {"format": "%(message)s"}},
+    "handlers": {
+        "slow_queries": {
+            "class": "logging.handlers.RotatingFileHandler",
+            "filename": SLOW_QUERY_LOG_PATH,
+            "maxBytes": 10 * 1024 * 1024,
+            "backupCount": 5,
+            "encoding": "utf-8",
+            "delay": True,
+            "formatter": "message",
+        }
+    },
+    "loggers": {
+        "foodgram.slow_queries": {
+            "handlers": ["slow_queries"],
+            "level": "WARNING",
+            "propagate": False,
+        }
+    },
+}
+BENCHMARK_BASELINE_PATH = BASE_DIR / "benchmarks.json"
+INGREDIENT_CATALOG_PATH = BASE_DIR / "ingredients.catalog"
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
+MEDIA_LOCK_DIR = BASE_DIR / "cache" / "media_locks"
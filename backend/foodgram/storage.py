@@ -0,0 +1,120 @@
+import hashlib
+import os
+import posixpath
+import time
+from contextlib import contextmanager
+from django.apps import apps
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+HASH_LENGTH = 32
+LOCK_STRIPES = 64
+# Файл, который недавно сохраняли, не удаляется: запись со ссылкой на него
+# может быть еще не зафиксирована. Такие файлы позже удаляет gc_media.
+DELETE_GRACE_PERIOD = 300
+# Поля, которые ссылаются на файлы хранилища: (app_label, model, field).
+REFERENCE_FIELDS = (("recipes", "Recipe", "image"), ("users", "User", "avatar"))
+
+
+def get_hashed_name(content, extension):
+    # Имя файла зависит только от содержимого, поэтому URL неизменен
+    # и nginx может отдавать файл с Cache-Control: immutable.
+    return f"{hashlib.sha256(content).hexdigest()[:HASH_LENGTH]}.{extension}"
+
+
+def get_reference_fields():
+    return [
+        (apps.get_model(app_label, model_name), field_name)
+        for app_label, model_name, field_name in REFERENCE_FIELDS
+    ]
+
+
+def has_references(name):
+    # Поля ссылок проиндексированы, проверка не просматривает таблицы.
+    return any(
+        model._base_manager.filter(**{field_name: name}).exists()
+        for model, field_name in get_reference_fields()
+    )
+
+
+@contextmanager
+def name_lock(name):
+    # flock на файл слота: сохранение и удаление одного имени не пересекаются
+    # ни между потоками, ни между воркерами.
+    if fcntl is None:
+        yield
+        return
+    stripe = int(hashlib.md5(name.encode()).hexdigest()[:8], 16) % LOCK_STRIPES
+    os.makedirs(settings.MEDIA_LOCK_DIR, exist_ok=True)
+    with open(os.path.join(settings.MEDIA_LOCK_DIR, f"{stripe}.lock"), "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    # Одинаковое содержимое хранится в одном файле. Файл удаляется,
+    # только когда на него не ссылается ни одна запись в базе.
+
+    def _save(self, name, content):
+        directory, file_name = posixpath.split(name)
+        extension = file_name.rsplit(".", 1)[-1].lower() if "." in file_name else "bin"
+        content.seek(0)
+        name = posixpath.join(directory, get_hashed_name(content.read(), extension))
+        with name_lock(name):
+            if self.exists(name):
+                # Продлевает DELETE_GRACE_PERIOD для уже сохраненного файла.
+                os.utime(self.path(name))
+                return name
+            content.seek(0)
+            return super()._save(name, content)
+
+    def delete(self, name):
+        if not name:
+            return
+        with name_lock(name):
+            try:
+                modified = os.path.getmtime(self.path(name))
+            except FileNotFoundError:
+                return
+            if time.time() - modified < DELETE_GRACE_PERIOD:
+                return
+            if not has_references(name):
+                super().delete(name)
+
+
+def delete_file_on_commit(storage, name):
+    if name:
+        transaction.on_commit(lambda: storage.delete(name))
+
+
+def remember_replaced_file(instance, field_name, update_fields=None):
+    # Вызывается в pre_save: старое имя удаляется уже после сохранения записи,
+    # иначе вне транзакции файл проверялся бы, пока на него еще есть ссылка.
+    if instance.pk is None or (
+        update_fields is not None and field_name not in update_fields
+    ):
+        return
+    old_name = (
+        type(instance)
+        ._base_manager.filter(pk=instance.pk)
+        .values_list(field_name, flat=True)
+        .first()
+    )
+    if old_name:
+        instance.__dict__.setdefault("_replaced_files", {})[field_name] = old_name
+
+
+def release_replaced_file(instance, field_name):
+    old_name = instance.__dict__.get("_replaced_files", {}).pop(field_name, None)
+    field_file = getattr(instance, field_name)
+    if old_name and old_name != field_file.name:
+        delete_file_on_commit(field_file.storage, old_name)
@@ -2,12 +2,22 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
+from api.admin_views import profile_download, profile_list, slow_query_list
+from api.views import short_link_redirect
 
 urlpatterns = [
+    path("admin/profiles/", profile_list, name="admin-profiles"),
+    path(
+        "admin/profiles/<str:name>.<str:extension>",
+        profile_download,
+        name="admin-profile-download",
+    ),
+    path("admin/slow-queries/", slow_query_list, name="admin-slow-queries"),
     path("admin/", admin.site.urls),
     path("api/", include("api.urls")),
     path("api/auth/", include("djoser.urls.authtoken")),
     path("api/", include("djoser.urls")),
+    path("s/<str:code>", short_link_redirect, name="short-link"),
 ]
 if settings.DEBUG:
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
@@ -1,21 +1,38 @@
 from django.contrib import admin
+from django.db import transaction
 from .models import (
     Ingredient,
+    IngredientNutrition,
     Tag,
     Recipe,
     RecipeIngredient,
     Favorite,
     ShoppingCart,
     Follow,
+    ChangeLogEntry,
+    ConsumerOffset,
 )
-from django.db.models import Count
+from .admin_utils import (
+    LargeTableAdminMixin,
+    RecipeChangeList,
+    SoftDeleteAdminMixin,
+    input_filter,
+)
+from .deletion import soft_delete_recipes
+from .nutrition import update_recipe_nutrition
+from .similarity import update_recipe_similarity
+
+
+class IngredientNutritionInline(admin.StackedInline):
+    model = IngredientNutrition
 
 
 @admin.register(Ingredient)
-class IngredientAdmin(admin.ModelAdmin):
+class IngredientAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     list_display = ("name", "measurement_unit")
     search_fields = ("name",)
-    list_filter = ("name",)
+    list_filter = (input_filter("name__istartswith", "названию"),)
+    inlines = (IngredientNutritionInline,)
 
 
 @admin.register(Tag)
@@ -33,29 +50,49 @@ class RecipeIngredientInline(admin.TabularInline):
 
 
 @admin.register(Recipe)
-class RecipeAdmin(admin.ModelAdmin):
+class RecipeAdmin(SoftDeleteAdminMixin, LargeTableAdminMixin, admin.ModelAdmin):
     list_display = (
         "name",
         "get_author_username",
         "cooking_time",
         "pub_date",
         "get_times_favorited",
+        "views_count",
+        "short_link_clicks",
     )
     search_fields = ("name", "author__username", "author__email")
-    list_filter = ("author__username", "name", "tags")
+    list_filter = (
+        input_filter("author__username", "автору"),
+        input_filter("name__istartswith", "названию"),
+        "tags",
+    )
+    list_select_related = ("author",)
     inlines = (RecipeIngredientInline,)
-    readonly_fields = ("get_times_favorited_display", "pub_date")
+    soft_delete = staticmethod(soft_delete_recipes)
+    readonly_fields = (
+        "get_times_favorited_display",
+        "pub_date",
+        "views_count",
+        "short_link_clicks",
+        "kcal",
+        "protein",
+        "fat",
+        "carbs",
+    )
 
-    def get_queryset(self, request):
-        queryset = super().get_queryset(request)
-        queryset = queryset.annotate(times_favorited=Count("favorited_by"))
-        return queryset
+    def get_changelist(self, request, **kwargs):
+        return RecipeChangeList
+
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        update_recipe_nutrition(form.instance)
+        transaction.on_commit(lambda: update_recipe_similarity(form.instance.id))
 
     @admin.display(description="Автор", ordering="author__username")
     def get_author_username(self, obj):
         return obj.author.username
 
-    @admin.display(description="В избранном (раз)", ordering="times_favorited")
+    @admin.display(description="В избранном (раз)")
     def get_times_favorited(self, obj):
         return obj.times_favorited
 
@@ -67,30 +104,42 @@ class RecipeAdmin(admin.ModelAdmin):
 
 
 @admin.register(RecipeIngredient)
-class RecipeIngredientAdmin(admin.ModelAdmin):
+class RecipeIngredientAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     list_display = ("recipe", "ingredient", "amount")
-    list_filter = ("recipe__name", "ingredient__name")
+    list_filter = (
+        input_filter("recipe__name__istartswith", "рецепту"),
+        input_filter("ingredient__name__istartswith", "ингредиенту"),
+    )
+    list_select_related = ("recipe", "ingredient")
     search_fields = ("recipe__name", "ingredient__name")
 
 
 @admin.register(Favorite)
-class FavoriteAdmin(admin.ModelAdmin):
+class FavoriteAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     list_display = ("user", "recipe", "date_added")
     search_fields = ("user__username", "user__email", "recipe__name")
-    list_filter = ("user__username", "recipe__name")
+    list_filter = (
+        input_filter("user__username", "пользователю"),
+        input_filter("recipe__name__istartswith", "рецепту"),
+    )
+    list_select_related = ("user", "recipe")
     autocomplete_fields = ("user", "recipe")
 
 
 @admin.register(ShoppingCart)
-class ShoppingCartAdmin(admin.ModelAdmin):
+class ShoppingCartAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     list_display = ("user", "recipe", "date_added")
     search_fields = ("user__username", "user__email", "recipe__name")
-    list_filter = ("user__username", "recipe__name")
+    list_filter = (
+        input_filter("user__username", "пользователю"),
+        input_filter("recipe__name__istartswith", "рецепту"),
+    )
+    list_select_related = ("user", "recipe")
     autocomplete_fields = ("user", "recipe")
 
 
 @admin.register(Follow)
-class FollowAdmin(admin.ModelAdmin):
+class FollowAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     list_display = ("user", "author", "date_followed")
     search_fields = (
         "user__username",
@@ -98,5 +147,27 @@ class FollowAdmin(admin.ModelAdmin):
         "author__username",
         "author__email",
     )
-    list_filter = ("user__username", "author__username")
+    list_filter = (
+        input_filter("user__username", "подписчику"),
+        input_filter("author__username", "автору"),
+    )
+    list_select_related = ("user", "author")
     autocomplete_fields = ("user", "author")
+
+
+@admin.register(ChangeLogEntry)
+class ChangeLogEntryAdmin(LargeTableAdminMixin, admin.ModelAdmin):
+    list_display = ("id", "action", "model", "object_id", "data", "created_at")
+    list_filter = ("action", input_filter("model", "модели"))
+    readonly_fields = ("model", "object_id", "action", "data", "created_at")
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(ConsumerOffset)
+class ConsumerOffsetAdmin(admin.ModelAdmin):
+    list_display = ("consumer", "last_id", "updated_at")
@@ -0,0 +1,153 @@
+from django.contrib import admin
+from django.contrib.admin.views.main import ChangeList
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Count
+from django.utils.functional import cached_property
+from .constants import ADMIN_COUNT_LIMIT, ADMIN_FAVORITES_CACHE_TIMEOUT
+from .models import Favorite
+
+FAVORITES_COUNT_CACHE_KEY = "admin:favorites:{}"
+
+
+class InputFilter(admin.SimpleListFilter):
+    # Фильтр с полем ввода вместо списка всех значений:
+    # страница не строит DISTINCT по всей таблице.
+    template = "admin/input_filter.html"
+    lookup = None
+
+    def lookups(self, request, model_admin):
+        return ()
+
+    def has_output(self):
+        return True
+
+    def queryset(self, request, queryset):
+        value = (self.value() or "").strip()
+        if value:
+            return queryset.filter(**{self.lookup: value})
+        return queryset
+
+    def choices(self, changelist):
+        yield {
+            "query_parts": [
+                (name, value)
+                for name, values in changelist.filter_params.items()
+                if name != self.parameter_name
+                for value in values
+            ]
+        }
+
+
+def input_filter(lookup, title):
+    return type(
+        "InputFilter",
+        (InputFilter,),
+        {"lookup": lookup, "parameter_name": lookup, "title": title},
+    )
+
+
+def get_estimated_count(queryset):
+    with connections[queryset.db].cursor() as cursor:
+        cursor.execute(
+            "SELECT reltuples FROM pg_class WHERE relname = %s",
+            [queryset.model._meta.db_table],
+        )
+        row = cursor.fetchone()
+    return max(int(row[0]), 0) if row else 0
+
+
+def has_default_filters_only(queryset):
+    # Скрытие помеченных на удаление добавляет менеджер по умолчанию,
+    # на оценку размера таблицы оно почти не влияет.
+    where = queryset.query.where
+    return not where or where == queryset.model._default_manager.all().query.where
+
+
+class EstimatedCountPaginator(Paginator):
+    # Без фильтров на PostgreSQL берется оценка из статистики таблицы,
+    # в остальных случаях строки считаются точно, чтобы все страницы
+    # оставались доступны.
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if (
+            has_default_filters_only(queryset)
+            and connections[queryset.db].vendor == "postgresql"
+        ):
+            estimate = get_estimated_count(queryset)
+            if estimate >= ADMIN_COUNT_LIMIT:
+                return estimate
+        return queryset.order_by().count()
+
+
+class LargeTableAdminMixin:
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+class SoftDeleteAdminMixin:
+    # Удаление из админки только помечает объекты, связанные строки и файлы
+    # удаляет фоновая очистка, поэтому страница подтверждения их не обходит.
+    # soft_delete — функция пометки, принимающая список id, например
+    # staticmethod(soft_delete_recipes).
+    soft_delete = None
+
+    def delete_model(self, request, obj):
+        self.soft_delete([obj.pk])
+
+    def delete_queryset(self, request, queryset):
+        self.soft_delete(list(queryset.values_list("pk", flat=True)))
+
+    def get_deleted_objects(self, objs, request):
+        objs = list(objs)
+        perms_needed = set()
+        if not self.has_delete_permission(request):
+            perms_needed.add(self.opts.verbose_name)
+        return (
+            [str(obj) for obj in objs],
+            {self.opts.verbose_name_plural: len(objs)},
+            perms_needed,
+            [],
+        )
+
+
+def get_favorite_counts(recipe_ids):
+    keys = {
+        recipe_id: FAVORITES_COUNT_CACHE_KEY.format(recipe_id)
+        for recipe_id in recipe_ids
+    }
+    cached = cache.get_many(keys.values())
+    counts = {
+        recipe_id: cached[key] for recipe_id, key in keys.items() if key in cached
+    }
+    missing = [recipe_id for recipe_id in recipe_ids if recipe_id not in counts]
+    if missing:
+        found = dict(
+            Favorite.objects.filter(recipe_id__in=missing)
+            .values("recipe_id")
+            .annotate(count=Count("id"))
+            .order_by()
+            .values_list("recipe_id", "count")
+        )
+        fresh = {recipe_id: found.get(recipe_id, 0) for recipe_id in missing}
+        cache.set_many(
+            {keys[recipe_id]: count for recipe_id, count in fresh.items()},
+            ADMIN_FAVORITES_CACHE_TIMEOUT,
+        )
+        counts.update(fresh)
+    return counts
+
+
+class RecipeChangeList(ChangeList):
+    # Число добавлений в избранное считается только для рецептов
+    # текущей страницы и кешируется на ADMIN_FAVORITES_CACHE_TIMEOUT секунд.
+
+    def get_results(self, request):
+        super().get_results(request)
+        recipes = list(self.result_list)
+        counts = get_favorite_counts([recipe.id for recipe in recipes])
+        for recipe in recipes:
+            recipe.times_favorited = counts[recipe.id]
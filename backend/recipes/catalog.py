@@ -0,0 +1,177 @@
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+from contextlib import contextmanager
+from django.conf import settings
+from django.db import transaction
+from .models import Ingredient
+
+# Формат снимка каталога ингредиентов (little-endian, секции выровнены по 8 байт):
+#   заголовок: magic, версия формата, число записей, идентификатор сборки;
+#   key_offsets[count + 1]: смещения ключей (casefold-названий в UTF-8);
+#   item_offsets[count + 1]: смещения JSON-объектов ингредиентов в теле ответа;
+#   ключи подряд, затем готовое тело ответа "[{...},{...}]".
+# Записи отсортированы по ключу, поэтому результат поиска по префиксу —
+# непрерывный кусок тела ответа.
+MAGIC = b"FGIC"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<4sIQQ")
+OFFSET = struct.Struct("<Q")
+
+local = threading.local()
+snapshot_lock = threading.Lock()
+current_snapshot = None
+
+
+def get_catalog_path():
+    return str(settings.INGREDIENT_CATALOG_PATH)
+
+
+def render_item(ingredient_id, name, measurement_unit):
+    return json.dumps(
+        {"id": ingredient_id, "name": name, "measurement_unit": measurement_unit},
+        ensure_ascii=False,
+        separators=(",", ":"),
+    ).encode()
+
+
+def build_catalog(path=None):
+    path = path or get_catalog_path()
+    rows = sorted(
+        (name.casefold().encode(), ingredient_id, name, measurement_unit)
+        for ingredient_id, name, measurement_unit in Ingredient.objects.values_list(
+            "id", "name", "measurement_unit"
+        ).iterator(chunk_size=5000)
+    )
+    key_offsets = [0]
+    item_offsets = []
+    body = bytearray(b"[")
+    for key, ingredient_id, name, measurement_unit in rows:
+        key_offsets.append(key_offsets[-1] + len(key))
+        if item_offsets:
+            body += b","
+        item_offsets.append(len(body))
+        body += render_item(ingredient_id, name, measurement_unit)
+    body += b"]"
+    item_offsets.append(len(body))
+    keys = b"".join(row[0] for row in rows)
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "wb") as catalog_file:
+        catalog_file.write(
+            HEADER.pack(MAGIC, FORMAT_VERSION, len(rows), time.time_ns())
+        )
+        for offset in key_offsets + item_offsets:
+            catalog_file.write(OFFSET.pack(offset))
+        catalog_file.write(keys)
+        catalog_file.write(b"\0" * (-len(keys) % 8))
+        catalog_file.write(body)
+        catalog_file.flush()
+        os.fsync(catalog_file.fileno())
+    os.replace(temp_path, path)
+    return len(rows)
+
+
+class CatalogSnapshot:
+
+    def __init__(self, path):
+        with open(path, "rb") as catalog_file:
+            stat = os.fstat(catalog_file.fileno())
+            self.mmap = mmap.mmap(catalog_file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.identity = (stat.st_ino, stat.st_mtime_ns)
+        magic, version, self.count, self.build_id = HEADER.unpack_from(self.mmap)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError(f"Некорректный снимок каталога: {path}")
+        view = memoryview(self.mmap)
+        start = HEADER.size
+        self.key_offsets = view[start : start + 8 * (self.count + 1)].cast("Q")
+        start += 8 * (self.count + 1)
+        self.item_offsets = view[start : start + 8 * (self.count + 1)].cast("Q")
+        start += 8 * (self.count + 1)
+        self.keys_start = start
+        keys_length = self.key_offsets[self.count]
+        self.body_start = start + keys_length + (-keys_length % 8)
+        self.body = view[self.body_start :]
+
+    def get_key(self, index):
+        start = self.keys_start + self.key_offsets[index]
+        return self.mmap[start : self.keys_start + self.key_offsets[index + 1]]
+
+    def bisect(self, key):
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self.get_key(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def search(self, prefix):
+        prefix = prefix.casefold().encode()
+        low = self.bisect(prefix)
+        # В UTF-8 нет байта 0xff, поэтому все ключи с префиксом меньше prefix + 0xff.
+        high = self.bisect(prefix + b"\xff")
+        if low == high:
+            return b"[]"
+        return b"".join(
+            (
+                b"[",
+                self.body[self.item_offsets[low] : self.item_offsets[high] - 1],
+                b"]",
+            )
+        )
+
+
+def get_catalog_snapshot():
+    # Каждый воркер отображает файл в память; после атомарной замены файла
+    # снимок переоткрывается по изменившемуся inode.
+    global current_snapshot
+    path = get_catalog_path()
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    identity = (stat.st_ino, stat.st_mtime_ns)
+    snapshot = current_snapshot
+    if snapshot is None or snapshot.identity != identity:
+        with snapshot_lock:
+            snapshot = current_snapshot
+            if snapshot is None or snapshot.identity != identity:
+                snapshot = current_snapshot = CatalogSnapshot(path)
+    return snapshot
+
+
+def rebuild_catalog():
+    build_catalog()
+
+
+def schedule_catalog_rebuild():
+    if getattr(local, "suspended", False):
+        local.changed = True
+        return
+    # Несколько изменений в одной транзакции пересобирают снимок один раз.
+    if any(
+        entry[1] is rebuild_catalog
+        for entry in transaction.get_connection().run_on_commit
+    ):
+        return
+    transaction.on_commit(rebuild_catalog)
+
+
+@contextmanager
+def catalog_rebuild_suspended():
+    # Массовые изменения ингредиентов пересобирают снимок один раз в конце.
+    local.suspended = True
+    local.changed = False
+    try:
+        yield
+    finally:
+        local.suspended = False
+        if local.changed:
+            schedule_catalog_rebuild()
@@ -0,0 +1,163 @@
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import Min
+from django.utils import timezone
+from .constants import (
+    CHANGELOG_BATCH_SIZE,
+    CHANGELOG_GAP_TIMEOUT,
+    CHANGELOG_POLL_INTERVAL,
+)
+from .models import (
+    ChangeLogEntry,
+    ConsumerOffset,
+    Favorite,
+    Follow,
+    Recipe,
+    RecipeIngredient,
+    ShoppingCart,
+)
+
+User = get_user_model()
+
+# Отслеживаемые модели и поля, которые пишутся в data записи журнала, чтобы
+# потребителю не нужно было читать удаленный объект.
+TRACKED_MODELS = {
+    Recipe: ("author_id",),
+    RecipeIngredient: ("recipe_id", "ingredient_id"),
+    Favorite: ("user_id", "recipe_id"),
+    ShoppingCart: ("user_id", "recipe_id"),
+    Follow: ("user_id", "author_id"),
+    User: (),
+}
+GENERATION_CACHE_KEY = "changelog:generation:{}"
+
+
+class GenerationBump:
+    # Одна отложенная до фиксации транзакции отметка на все изменения в ней.
+
+    def __init__(self):
+        self.labels = set()
+
+    def __call__(self):
+        caches[settings.SHARED_CACHE_ALIAS].set_many(
+            {
+                GENERATION_CACHE_KEY.format(label): time.time_ns()
+                for label in self.labels
+            },
+            None,
+        )
+
+
+def schedule_generation_bump(labels):
+    for entry in transaction.get_connection().run_on_commit:
+        if isinstance(entry[1], GenerationBump):
+            entry[1].labels.update(labels)
+            return
+    bump = GenerationBump()
+    bump.labels.update(labels)
+    transaction.on_commit(bump)
+
+
+def get_generation(labels):
+    # Меняется после каждой зафиксированной транзакции, изменившей любую
+    # из моделей labels; подходит для версионирования кешей.
+    keys = [GENERATION_CACHE_KEY.format(label) for label in labels]
+    values = caches[settings.SHARED_CACHE_ALIAS].get_many(keys)
+    return "-".join(str(values.get(key, 0)) for key in keys)
+
+
+def record_changes(instances, action):
+    # Вызывается в той же транзакции, что и изменение, поэтому запись
+    # журнала и данные фиксируются или откатываются вместе.
+    instances = list(instances)
+    if not instances:
+        return
+    ChangeLogEntry.objects.bulk_create(
+        ChangeLogEntry(
+            model=instance._meta.label_lower,
+            object_id=instance.pk,
+            action=action,
+            data={
+                field: getattr(instance, field)
+                for field in TRACKED_MODELS[type(instance)]
+            },
+        )
+        for instance in instances
+    )
+    schedule_generation_bump({instance._meta.label_lower for instance in instances})
+
+
+def record_change(instance, action):
+    record_changes([instance], action)
+
+
+def get_offset(consumer):
+    return (
+        ConsumerOffset.objects.filter(consumer=consumer)
+        .values_list("last_id", flat=True)
+        .first()
+        or 0
+    )
+
+
+def read_changes(after_id=0, limit=CHANGELOG_BATCH_SIZE):
+    # Идентификаторы выдаются при вставке, а не при фиксации транзакции:
+    # запись с меньшим id может стать видна позже записи с большим. Поэтому
+    # чтение останавливается перед свежим пропуском в нумерации и пропускает
+    # его, только когда он старше CHANGELOG_GAP_TIMEOUT (откаченная транзакция).
+    entries = list(ChangeLogEntry.objects.filter(id__gt=after_id)[:limit])
+    gap_deadline = timezone.now() - timedelta(seconds=CHANGELOG_GAP_TIMEOUT)
+    previous_id = after_id
+    for index, entry in enumerate(entries):
+        if (
+            previous_id
+            and entry.id != previous_id + 1
+            and entry.created_at > gap_deadline
+        ):
+            return entries[:index]
+        previous_id = entry.id
+    return entries
+
+
+def wait_for_changes(after_id, timeout, limit=CHANGELOG_BATCH_SIZE):
+    deadline = time.monotonic() + timeout
+    while True:
+        entries = read_changes(after_id, limit)
+        if entries or time.monotonic() >= deadline:
+            return entries
+        time.sleep(min(CHANGELOG_POLL_INTERVAL, max(deadline - time.monotonic(), 0)))
+
+
+def acknowledge(consumer, last_id):
+    offset, created = ConsumerOffset.objects.get_or_create(
+        consumer=consumer, defaults={"last_id": last_id}
+    )
+    if not created:
+        ConsumerOffset.objects.filter(consumer=consumer, last_id__lt=last_id).update(
+            last_id=last_id, updated_at=timezone.now()
+        )
+
+
+def consume(consumer, handler, limit=CHANGELOG_BATCH_SIZE):
+    # Доставка «хотя бы один раз»: позиция сдвигается только после того,
+    # как handler обработал пачку без исключения.
+    entries = read_changes(get_offset(consumer), limit)
+    if entries:
+        handler(entries)
+        acknowledge(consumer, entries[-1].id)
+    return len(entries)
+
+
+def trim_changelog(older_than):
+    # Удаляются только записи, которые прочитали все потребители.
+    entries = ChangeLogEntry.objects.filter(created_at__lt=older_than)
+    min_offset = ConsumerOffset.objects.aggregate(min_offset=Min("last_id"))[
+        "min_offset"
+    ]
+    if min_offset is not None:
+        entries = entries.filter(id__lte=min_offset)
+    return entries.delete()[0]
@@ -1,4 +1,42 @@
 MIN_COOKING_TIME = 1
 MAX_COOKING_TIME = 32000
 MIN_INGREDIENT_AMOUNT = 1
-MAX_INGREDIENT_AMOUNT = 32000 
\ No newline at end of file
+MAX_INGREDIENT_AMOUNT = 32000
+EXPORT_CHUNK_SIZE = 1000
+IMPORT_BATCH_SIZE = 500
+IMPORT_IMAGE_MAX_SIZE = 1024
+FEED_FANOUT_MAX_FOLLOWERS = 1000
+FEED_FANOUT_AUTHORS_CACHE_TIMEOUT = 600
+FEED_BACKFILL_SIZE = 100
+FEED_MAX_ENTRIES = 1000
+FEED_MAX_PAGE_SIZE = 100
+SIMILAR_RECIPES_COUNT = 10
+SIMILARITY_BLOCK_SIZE = 1024
+SIMILARITY_METRIC = "jaccard"
+TRENDING_HALF_LIFE_HOURS = 24
+TRENDING_FAVORITE_WEIGHT = 1.0
+TRENDING_SHOPPING_CART_WEIGHT = 0.5
+TRENDING_MIN_SCORE = 0.001
+TRENDING_TOP_COUNT = 50
+TRENDING_CACHE_TIMEOUT = 600
+COUNTERS_FLUSH_INTERVAL = 10
+COUNTERS_FLUSH_BATCH_SIZE = 500
+SHORT_LINK_CACHE_TIMEOUT = 24 * 60 * 60
+SHORT_LINK_MISS_CACHE_TIMEOUT = 60
+ADMIN_COUNT_LIMIT = 10000
+ADMIN_FAVORITES_CACHE_TIMEOUT = 300
+GC_MEDIA_MIN_AGE_HOURS = 24
+NUTRITION_BATCH_SIZE = 1000
+CHANGELOG_BATCH_SIZE = 500
+CHANGELOG_POLL_INTERVAL = 1
+CHANGELOG_GAP_TIMEOUT = 10
+CHANGELOG_LONG_POLL_TIMEOUT = 25
+CHANGELOG_STREAM_TIMEOUT = 55
+CHANGELOG_KEEPALIVE_INTERVAL = 15
+CHANGELOG_MAX_WAITERS = 4
+CHANGELOG_RETENTION_DAYS = 7
+COALESCE_FRESH_TIMEOUT = 30
+COALESCE_STALE_TIMEOUT = 300
+COALESCE_WAIT_TIMEOUT = 5
+COALESCE_LOCK_STRIPES = 256
+PURGE_BATCH_SIZE = 500
@@ -0,0 +1,84 @@
+import atexit
+import logging
+import threading
+from collections import Counter
+from django.db import DatabaseError, connection
+from django.db.models import Case, F, IntegerField, Value, When
+from .constants import COUNTERS_FLUSH_BATCH_SIZE, COUNTERS_FLUSH_INTERVAL
+from .models import Recipe
+
+logger = logging.getLogger(__name__)
+
+
+class BufferedCounter:
+    # Приращения копятся в памяти процесса и сбрасываются одним
+    # UPDATE ... CASE раз в flush_interval секунд и при завершении процесса.
+    # При аварийном завершении теряются не более flush_interval секунд.
+
+    registry = []
+
+    def __init__(self, model, field, flush_interval=COUNTERS_FLUSH_INTERVAL):
+        self.model = model
+        self.field = field
+        self.flush_interval = flush_interval
+        self.pending = Counter()
+        self.lock = threading.Lock()
+        self.timer = None
+        self.registry.append(self)
+
+    def increment(self, pk, amount=1):
+        with self.lock:
+            self.pending[pk] += amount
+            self.schedule_flush()
+
+    def schedule_flush(self):
+        # Вызывается под self.lock.
+        if self.timer is None:
+            self.timer = threading.Timer(self.flush_interval, self.flush_in_thread)
+            self.timer.daemon = True
+            self.timer.start()
+
+    def flush_in_thread(self):
+        try:
+            self.flush()
+        finally:
+            connection.close()
+
+    def flush(self):
+        with self.lock:
+            pending, self.pending = self.pending, Counter()
+            if self.timer is not None:
+                self.timer.cancel()
+                self.timer = None
+        items = list(pending.items())
+        for start in range(0, len(items), COUNTERS_FLUSH_BATCH_SIZE):
+            batch = dict(items[start : start + COUNTERS_FLUSH_BATCH_SIZE])
+            increment = Case(
+                *(When(pk=pk, then=Value(amount)) for pk, amount in batch.items()),
+                default=Value(0),
+                output_field=IntegerField(),
+            )
+            try:
+                self.model._base_manager.filter(pk__in=batch).update(
+                    **{self.field: F(self.field) + increment}
+                )
+            except DatabaseError:
+                logger.exception("Не удалось сохранить счетчик %s", self.field)
+                # Несохраненное возвращается к приращениям, накопленным
+                # за время сброса, и сбрасывается снова через flush_interval.
+                with self.lock:
+                    for pk, amount in items[start:]:
+                        self.pending[pk] = self.pending.get(pk, 0) + amount
+                    self.schedule_flush()
+                break
+        return len(items)
+
+
+@atexit.register
+def flush_all():
+    for counter in BufferedCounter.registry:
+        counter.flush()
+
+
+recipe_views = BufferedCounter(Recipe, "views_count")
+short_link_clicks = BufferedCounter(Recipe, "short_link_clicks")
@@ -0,0 +1,163 @@
+import logging
+import threading
+from django.contrib.auth import get_user_model
+from django.db import connections, transaction
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from .changelog import record_change, record_changes
+from .constants import PURGE_BATCH_SIZE
+from .models import (
+    ChangeLogEntry,
+    Favorite,
+    FeedEntry,
+    Follow,
+    HighFanoutAuthor,
+    Recipe,
+    RecipeIngredient,
+    RecipeSimilarity,
+    ShoppingCart,
+    ShoppingCartIngredient,
+)
+from .shortlinks import forget_recipe
+
+User = get_user_model()
+logger = logging.getLogger(__name__)
+
+# Зависимые строки удаляются пачками до удаления самого объекта, чтобы
+# каскад Django не удалял их одной большой транзакцией.
+RECIPE_DEPENDENCIES = (
+    (Favorite, "recipe_id"),
+    (ShoppingCart, "recipe_id"),
+    (FeedEntry, "recipe_id"),
+    (RecipeSimilarity, "recipe_id"),
+    (RecipeSimilarity, "similar_id"),
+    (RecipeIngredient, "recipe_id"),
+)
+USER_DEPENDENCIES = (
+    (ShoppingCartIngredient, "user_id"),
+    (ShoppingCart, "user_id"),
+    (Favorite, "user_id"),
+    (Follow, "user_id"),
+    (Follow, "author_id"),
+    (FeedEntry, "user_id"),
+    (HighFanoutAuthor, "author_id"),
+    (Token, "user_id"),
+)
+purge_lock = threading.Lock()
+purge_requested = threading.Event()
+
+
+def soft_delete_recipes(recipe_ids):
+    # Рецепты сразу пропадают из выдачи, а строки, файлы и связи удаляет
+    # фоновая очистка после фиксации транзакции.
+    recipes = list(Recipe.objects.filter(pk__in=recipe_ids).only("id", "author_id"))
+    if not recipes:
+        return
+    with transaction.atomic():
+        Recipe.objects.filter(pk__in=[recipe.id for recipe in recipes]).update(
+            deleted_at=timezone.now()
+        )
+        # Строки ShoppingCart остаются до очистки, а сводка списка покупок
+        # сразу перестает учитывать удаленные рецепты.
+        for recipe in recipes:
+            ShoppingCartIngredient.objects.remove_recipe_from_carts(recipe)
+        record_changes(recipes, ChangeLogEntry.DELETE)
+        transaction.on_commit(lambda: forget_recipes(recipes))
+        transaction.on_commit(request_purge)
+
+
+def soft_delete_user(user):
+    # Почта и имя пользователя освобождаются сразу, чтобы их можно было
+    # занять новой регистрацией до фоновой очистки.
+    with transaction.atomic():
+        User.objects.filter(pk=user.pk).update(
+            deleted_at=timezone.now(),
+            is_active=False,
+            email=f"{user.pk}@deleted.invalid",
+            username=f"deleted-{user.pk}",
+        )
+        Token.objects.filter(user=user).delete()
+        soft_delete_recipes(
+            Recipe.objects.filter(author=user).values_list("id", flat=True)
+        )
+        record_change(user, ChangeLogEntry.DELETE)
+        transaction.on_commit(request_purge)
+
+
+def soft_delete_users(user_ids):
+    with transaction.atomic():
+        for user in User.objects.filter(pk__in=user_ids):
+            soft_delete_user(user)
+
+
+def forget_recipes(recipes):
+    for recipe in recipes:
+        forget_recipe(recipe.id)
+
+
+def delete_in_batches(queryset, batch_size):
+    deleted = 0
+    while True:
+        ids = list(queryset.values_list("pk", flat=True)[:batch_size])
+        if not ids:
+            return deleted
+        with transaction.atomic():
+            deleted += queryset.model._base_manager.filter(pk__in=ids).delete()[0]
+
+
+def delete_dependencies(dependencies, object_ids, batch_size):
+    for model, field in dependencies:
+        delete_in_batches(
+            model._base_manager.filter(**{f"{field}__in": object_ids}), batch_size
+        )
+
+
+def purge_deleted(batch_size=PURGE_BATCH_SIZE):
+    purged_recipes = 0
+    while True:
+        recipe_ids = list(
+            Recipe.all_objects.filter(deleted_at__isnull=False).values_list(
+                "id", flat=True
+            )[:batch_size]
+        )
+        if not recipe_ids:
+            break
+        delete_dependencies(RECIPE_DEPENDENCIES, recipe_ids, batch_size)
+        with transaction.atomic():
+            Recipe.all_objects.filter(pk__in=recipe_ids).delete()
+        purged_recipes += len(recipe_ids)
+    purged_users = 0
+    for user_id in list(
+        User.all_objects.filter(deleted_at__isnull=False).values_list("id", flat=True)
+    ):
+        delete_dependencies(USER_DEPENDENCIES, [user_id], batch_size)
+        with transaction.atomic():
+            User.all_objects.filter(pk=user_id).delete()
+        purged_users += 1
+    return purged_recipes, purged_users
+
+
+def run_purge():
+    # Повторная проверка после освобождения блокировки не дает потерять
+    # запрос, пришедший, пока поток заканчивал работу.
+    try:
+        while True:
+            try:
+                while purge_requested.is_set():
+                    purge_requested.clear()
+                    purge_deleted()
+            finally:
+                purge_lock.release()
+            if not purge_requested.is_set() or not purge_lock.acquire(blocking=False):
+                return
+    except Exception:
+        logger.exception("Не удалось удалить помеченные на удаление записи")
+    finally:
+        connections.close_all()
+
+
+def request_purge():
+    # Оставшееся после остановки процесса дочищает команда purge_deleted.
+    purge_requested.set()
+    if purge_lock.acquire(blocking=False):
+        threading.Thread(target=run_purge, name="purge-deleted", daemon=True).start()
@@ -0,0 +1,70 @@
+import zlib
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from .constants import EXPORT_CHUNK_SIZE
+from .models import Recipe
+
+encoder = DjangoJSONEncoder(ensure_ascii=False, separators=(",", ":"))
+
+
+def parse_since(value):
+    since = parse_datetime(value)
+    if since is None:
+        raise ValueError(f"Некорректная дата: {value}")
+    if timezone.is_naive(since):
+        since = timezone.make_aware(since)
+    return since
+
+
+def get_export_queryset(since=None):
+    queryset = (
+        Recipe.objects.select_related("author")
+        .prefetch_related("recipeingredients__ingredient")
+        .order_by("updated_at", "id")
+    )
+    if since is not None:
+        queryset = queryset.filter(updated_at__gt=since)
+    return queryset
+
+
+def recipe_to_dict(recipe):
+    author = recipe.author
+    return {
+        "id": recipe.id,
+        "name": recipe.name,
+        "text": recipe.text,
+        "cooking_time": recipe.cooking_time,
+        "image": recipe.image.name,
+        "pub_date": recipe.pub_date,
+        "updated_at": recipe.updated_at,
+        "author": {
+            "id": author.id,
+            "username": author.username,
+            "first_name": author.first_name,
+            "last_name": author.last_name,
+        },
+        "ingredients": [
+            {
+                "id": recipe_ingredient.ingredient.id,
+                "name": recipe_ingredient.ingredient.name,
+                "measurement_unit": recipe_ingredient.ingredient.measurement_unit,
+                "amount": recipe_ingredient.amount,
+            }
+            for recipe_ingredient in recipe.recipeingredients.all()
+        ],
+    }
+
+
+def iter_recipes_ndjson(since=None, chunk_size=EXPORT_CHUNK_SIZE):
+    for recipe in get_export_queryset(since).iterator(chunk_size=chunk_size):
+        yield (encoder.encode(recipe_to_dict(recipe)) + "\n").encode()
+
+
+def gzip_stream(chunks):
+    compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
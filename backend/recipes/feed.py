@@ -0,0 +1,185 @@
+import base64
+import heapq
+import json
+from collections import defaultdict
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils.dateparse import parse_datetime
+from .constants import (
+    FEED_BACKFILL_SIZE,
+    FEED_FANOUT_AUTHORS_CACHE_TIMEOUT,
+    FEED_FANOUT_MAX_FOLLOWERS,
+    FEED_MAX_ENTRIES,
+)
+from .models import FeedEntry, Follow, HighFanoutAuthor, Recipe
+
+HIGH_FANOUT_AUTHORS_CACHE_KEY = "feed:high_fanout_authors"
+
+
+def get_high_fanout_authors():
+    # Рецепты авторов с большим числом подписчиков не раскладываются по лентам,
+    # а подмешиваются при чтении. Классификация хранится в HighFanoutAuthor и
+    # меняется командой update_feed_authors, кеш только избавляет от запроса.
+    cache = caches[settings.SHARED_CACHE_ALIAS]
+    author_ids = cache.get(HIGH_FANOUT_AUTHORS_CACHE_KEY)
+    if author_ids is None:
+        author_ids = set(HighFanoutAuthor.objects.values_list("author_id", flat=True))
+        cache.set(
+            HIGH_FANOUT_AUTHORS_CACHE_KEY,
+            author_ids,
+            FEED_FANOUT_AUTHORS_CACHE_TIMEOUT,
+        )
+    return author_ids
+
+
+def update_high_fanout_authors():
+    author_ids = set(
+        Follow.objects.values("author")
+        .annotate(followers=Count("id"))
+        .filter(followers__gt=FEED_FANOUT_MAX_FOLLOWERS)
+        .values_list("author", flat=True)
+    )
+    previous_author_ids = set(
+        HighFanoutAuthor.objects.values_list("author_id", flat=True)
+    )
+    promoted = author_ids - previous_author_ids
+    demoted = previous_author_ids - author_ids
+    with transaction.atomic():
+        HighFanoutAuthor.objects.bulk_create(
+            (HighFanoutAuthor(author_id=author_id) for author_id in promoted),
+            ignore_conflicts=True,
+        )
+        HighFanoutAuthor.objects.filter(author_id__in=demoted).delete()
+    caches[settings.SHARED_CACHE_ALIAS].delete(HIGH_FANOUT_AUTHORS_CACHE_KEY)
+    backfill_demoted_authors(demoted)
+    return len(promoted), len(demoted)
+
+
+def backfill_demoted_authors(author_ids):
+    # Рецепты, опубликованные, пока автор подмешивался при чтении, в ленты
+    # подписчиков не раскладывались.
+    for author_id in author_ids:
+        fan_out_recipes(
+            Recipe.objects.filter(author_id=author_id).order_by("-pub_date", "-id")[
+                :FEED_BACKFILL_SIZE
+            ]
+        )
+        for user_id in Follow.objects.filter(author_id=author_id).values_list(
+            "user_id", flat=True
+        ):
+            trim_feed(user_id)
+
+
+def fan_out_recipes(recipes):
+    high_fanout_authors = get_high_fanout_authors()
+    recipes_by_author = defaultdict(list)
+    for recipe in recipes:
+        if recipe.author_id not in high_fanout_authors:
+            recipes_by_author[recipe.author_id].append(recipe)
+    if not recipes_by_author:
+        return
+    followers = defaultdict(list)
+    for user_id, author_id in Follow.objects.filter(
+        author_id__in=recipes_by_author
+    ).values_list("user_id", "author_id"):
+        followers[author_id].append(user_id)
+    FeedEntry.objects.bulk_create(
+        (
+            FeedEntry(user_id=user_id, recipe=recipe, pub_date=recipe.pub_date)
+            for author_id, author_recipes in recipes_by_author.items()
+            for recipe in author_recipes
+            for user_id in followers[author_id]
+        ),
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+
+
+def trim_feed(user_id):
+    # Граница — пара (pub_date, recipe_id), как и порядок ленты: записи
+    # с той же датой, что у первой лишней, остаются.
+    cutoff = list(
+        FeedEntry.objects.filter(user_id=user_id)
+        .order_by("-pub_date", "-recipe_id")
+        .values_list("pub_date", "recipe_id")[FEED_MAX_ENTRIES : FEED_MAX_ENTRIES + 1]
+    )
+    if cutoff:
+        pub_date, recipe_id = cutoff[0]
+        FeedEntry.objects.filter(user_id=user_id).filter(
+            Q(pub_date__lt=pub_date) | Q(pub_date=pub_date, recipe_id__lte=recipe_id)
+        ).delete()
+
+
+def backfill_feed(user_id, author_id):
+    if author_id in get_high_fanout_authors():
+        return
+    recipes = Recipe.objects.filter(author_id=author_id).order_by("-pub_date", "-id")
+    FeedEntry.objects.bulk_create(
+        (
+            FeedEntry(user_id=user_id, recipe_id=recipe_id, pub_date=pub_date)
+            for recipe_id, pub_date in recipes.values_list("id", "pub_date")[
+                :FEED_BACKFILL_SIZE
+            ]
+        ),
+        ignore_conflicts=True,
+    )
+    trim_feed(user_id)
+
+
+def remove_author_from_feed(user_id, author_id):
+    FeedEntry.objects.filter(user_id=user_id, recipe__author_id=author_id).delete()
+
+
+def encode_cursor(pub_date, recipe_id):
+    data = json.dumps([pub_date.isoformat(), recipe_id]).encode()
+    return base64.urlsafe_b64encode(data).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        pub_date, recipe_id = json.loads(base64.urlsafe_b64decode(cursor))
+        pub_date = parse_datetime(pub_date)
+        recipe_id = int(recipe_id)
+    except (ValueError, TypeError):
+        raise ValueError("Некорректный курсор.")
+    if pub_date is None:
+        raise ValueError("Некорректный курсор.")
+    return pub_date, recipe_id
+
+
+def get_feed_page(user, limit, cursor=None):
+    timeline = FeedEntry.objects.filter(
+        user=user, recipe__deleted_at__isnull=True
+    ).order_by("-pub_date", "-recipe_id")
+    high_fanout_authors = get_high_fanout_authors() & set(
+        user.follower.values_list("author_id", flat=True)
+    )
+    merged = Recipe.objects.filter(author_id__in=high_fanout_authors).order_by(
+        "-pub_date", "-id"
+    )
+    if cursor is not None:
+        pub_date, recipe_id = cursor
+        timeline = timeline.filter(
+            Q(pub_date__lt=pub_date) | Q(pub_date=pub_date, recipe_id__lt=recipe_id)
+        )
+        merged = merged.filter(
+            Q(pub_date__lt=pub_date) | Q(pub_date=pub_date, id__lt=recipe_id)
+        )
+    candidates = [list(timeline.values_list("pub_date", "recipe_id")[: limit + 1])]
+    if high_fanout_authors:
+        candidates.append(list(merged.values_list("pub_date", "id")[: limit + 1]))
+    page = []
+    seen = set()
+    for key in heapq.merge(*candidates, reverse=True):
+        if key[1] in seen:
+            continue
+        seen.add(key[1])
+        page.append(key)
+        if len(page) > limit:
+            break
+    has_next = len(page) > limit
+    page = page[:limit]
+    next_cursor = encode_cursor(*page[-1]) if has_next else None
+    return [recipe_id for _, recipe_id in page], next_cursor
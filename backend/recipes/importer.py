@@ -0,0 +1,243 @@
+import base64
+import io
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from PIL import Image
+from foodgram.storage import get_hashed_name
+from .changelog import record_changes
+from .constants import (
+    IMPORT_BATCH_SIZE,
+    IMPORT_IMAGE_MAX_SIZE,
+    MAX_COOKING_TIME,
+    MAX_INGREDIENT_AMOUNT,
+    MIN_COOKING_TIME,
+    MIN_INGREDIENT_AMOUNT,
+)
+from .feed import fan_out_recipes
+from .models import ChangeLogEntry, Ingredient, Recipe, RecipeIngredient
+from .nutrition import compute_nutrition
+
+User = get_user_model()
+
+IMAGE_FORMATS = {"JPEG": "jpg", "PNG": "png", "GIF": "gif", "WEBP": "webp"}
+
+
+class RecipeImportError(Exception):
+    pass
+
+
+def prepare_image(source, images_dir=None, max_size=IMPORT_IMAGE_MAX_SIZE):
+    try:
+        if source.startswith("data:image"):
+            raw = base64.b64decode(source.split(";base64,", 1)[1])
+        else:
+            if not images_dir:
+                raise RecipeImportError("Не указана папка с изображениями.")
+            path = os.path.realpath(os.path.join(images_dir, source))
+            if not path.startswith(os.path.realpath(images_dir) + os.sep):
+                raise RecipeImportError(f"Недопустимый путь к изображению: {source}")
+            with open(path, "rb") as image_file:
+                raw = image_file.read()
+        image = Image.open(io.BytesIO(raw))
+        image_format = image.format if image.format in IMAGE_FORMATS else "PNG"
+        if max(image.size) > max_size:
+            image.thumbnail((max_size, max_size))
+            buffer = io.BytesIO()
+            image.save(buffer, format=image_format)
+            raw = buffer.getvalue()
+        return raw, IMAGE_FORMATS[image_format], None
+    except Exception as error:
+        return None, None, f"Некорректное изображение: {error}"
+
+
+def save_images(images):
+    for name, content in images.items():
+        default_storage.save(name, ContentFile(content))
+
+
+class RecipeImporter:
+
+    def __init__(
+        self,
+        images_dir=None,
+        batch_size=IMPORT_BATCH_SIZE,
+        workers=0,
+        default_author=None,
+        checkpoint=None,
+    ):
+        self.images_dir = images_dir
+        self.batch_size = batch_size
+        self.workers = workers
+        self.default_author = default_author
+        self.checkpoint = checkpoint
+        self.ingredient_ids = set(Ingredient.objects.values_list("id", flat=True))
+        self.imported = 0
+        self.errors = []
+
+    def read_checkpoint(self):
+        if not self.checkpoint or not os.path.exists(self.checkpoint):
+            return 0
+        with open(self.checkpoint, encoding="utf-8") as checkpoint_file:
+            return json.load(checkpoint_file)["line"]
+
+    def write_checkpoint(self, line_number):
+        if not self.checkpoint:
+            return
+        temp_path = f"{self.checkpoint}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as checkpoint_file:
+            json.dump({"line": line_number, "imported": self.imported}, checkpoint_file)
+        os.replace(temp_path, self.checkpoint)
+
+    def run(self, lines):
+        start = self.read_checkpoint()
+        executor = (
+            ProcessPoolExecutor(max_workers=self.workers) if self.workers else None
+        )
+        try:
+            batch = []
+            line_number = 0
+            for line_number, line in enumerate(lines, start=1):
+                if line_number <= start or not line.strip():
+                    continue
+                batch.append((line_number, line))
+                if len(batch) >= self.batch_size:
+                    self.import_batch(batch, executor)
+                    self.write_checkpoint(line_number)
+                    batch = []
+            if batch:
+                self.import_batch(batch, executor)
+            if line_number > start:
+                self.write_checkpoint(line_number)
+        finally:
+            if executor:
+                executor.shutdown()
+        return self.imported
+
+    def parse(self, line_number, line):
+        try:
+            data = json.loads(line)
+            name = str(data["name"]).strip()
+            text = str(data["text"])
+            cooking_time = int(data["cooking_time"])
+            image = str(data["image"])
+            ingredients = [
+                (int(item["id"]), int(item["amount"])) for item in data["ingredients"]
+            ]
+        except (ValueError, KeyError, TypeError) as error:
+            raise RecipeImportError(f"Некорректная запись: {error}")
+        if not name or len(name) > Recipe._meta.get_field("name").max_length:
+            raise RecipeImportError("Некорректное название рецепта.")
+        if not MIN_COOKING_TIME <= cooking_time <= MAX_COOKING_TIME:
+            raise RecipeImportError("Некорректное время приготовления.")
+        if not ingredients:
+            raise RecipeImportError("Хотя бы один ингредиент должен быть указан.")
+        ingredient_ids = [ingredient_id for ingredient_id, _ in ingredients]
+        if len(set(ingredient_ids)) != len(ingredient_ids):
+            raise RecipeImportError("Ингредиенты не должны повторяться.")
+        missing_ids = set(ingredient_ids) - self.ingredient_ids
+        if missing_ids:
+            raise RecipeImportError(
+                f"Ингредиенты не найдены: {', '.join(map(str, sorted(missing_ids)))}."
+            )
+        for _, amount in ingredients:
+            if not MIN_INGREDIENT_AMOUNT <= amount <= MAX_INGREDIENT_AMOUNT:
+                raise RecipeImportError("Некорректное количество ингредиента.")
+        author = data.get("author")
+        if isinstance(author, dict):
+            author = author.get("username")
+        return {
+            "line": line_number,
+            "author": author,
+            "name": name,
+            "text": text,
+            "cooking_time": cooking_time,
+            "image": image,
+            "ingredients": ingredients,
+        }
+
+    def resolve_authors(self, records):
+        usernames = {record["author"] for record in records if record["author"]}
+        authors = {
+            user.username: user for user in User.objects.filter(username__in=usernames)
+        }
+        resolved = []
+        for record in records:
+            author = (
+                authors.get(record["author"])
+                if record["author"]
+                else self.default_author
+            )
+            if author is None:
+                self.errors.append(
+                    (record["line"], f"Автор не найден: {record['author']}")
+                )
+                continue
+            record["author"] = author
+            resolved.append(record)
+        return resolved
+
+    def prepare_images(self, records, executor):
+        sources = [record["image"] for record in records]
+        images_dirs = [self.images_dir] * len(sources)
+        if executor:
+            results = executor.map(
+                prepare_image, sources, images_dirs, chunksize=max(len(sources) // 8, 1)
+            )
+        else:
+            results = map(prepare_image, sources, images_dirs)
+        prepared = []
+        for record, (content, extension, error) in zip(records, results):
+            if error:
+                self.errors.append((record["line"], error))
+                continue
+            record["image"] = (content, extension)
+            prepared.append(record)
+        return prepared
+
+    def import_batch(self, batch, executor):
+        records = []
+        for line_number, line in batch:
+            try:
+                records.append(self.parse(line_number, line))
+            except RecipeImportError as error:
+                self.errors.append((line_number, str(error)))
+        records = self.prepare_images(self.resolve_authors(records), executor)
+        if not records:
+            return
+        recipes = []
+        images = {}
+        for record in records:
+            content, extension = record["image"]
+            # Имя зависит только от содержимого, поэтому файл записывается
+            # после фиксации: откаченная пачка не оставляет файлов без ссылок.
+            image_name = f"recipes/images/{get_hashed_name(content, extension)}"
+            images[image_name] = content
+            recipes.append(
+                Recipe(
+                    author=record["author"],
+                    name=record["name"],
+                    text=record["text"],
+                    cooking_time=record["cooking_time"],
+                    image=image_name,
+                )
+            )
+        with transaction.atomic():
+            transaction.on_commit(lambda: save_images(images))
+            Recipe.objects.bulk_create(recipes)
+            recipe_ingredients = RecipeIngredient.objects.bulk_create(
+                RecipeIngredient(
+                    recipe=recipe, ingredient_id=ingredient_id, amount=amount
+                )
+                for recipe, record in zip(recipes, records)
+                for ingredient_id, amount in record["ingredients"]
+            )
+            record_changes(recipes, ChangeLogEntry.CREATE)
+            record_changes(recipe_ingredients, ChangeLogEntry.CREATE)
+        compute_nutrition([recipe.id for recipe in recipes])
+        fan_out_recipes(recipes)
+        self.imported += len(recipes)
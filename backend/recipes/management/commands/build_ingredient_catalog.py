@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from recipes.catalog import build_catalog, get_catalog_path
+
+
+class Command(BaseCommand):
+    help = "Собирает снимок каталога ингредиентов для отдачи через mmap."
+
+    def handle(self, *args, **options):
+        count = build_catalog()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Снимок каталога собран: {count} ингредиентов в {get_catalog_path()}"
+            )
+        )
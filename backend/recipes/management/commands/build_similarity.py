@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+from recipes.constants import (
+    SIMILAR_RECIPES_COUNT,
+    SIMILARITY_BLOCK_SIZE,
+    SIMILARITY_METRIC,
+)
+from recipes.similarity import METRICS, build_similarity
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает похожие рецепты по пересечению ингредиентов."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--top-k",
+            type=int,
+            default=SIMILAR_RECIPES_COUNT,
+            help="Сколько похожих рецептов хранить для каждого рецепта.",
+        )
+        parser.add_argument(
+            "--block-size",
+            type=int,
+            default=SIMILARITY_BLOCK_SIZE,
+            help="Количество рецептов, обрабатываемых за один блок.",
+        )
+        parser.add_argument(
+            "--metric",
+            choices=METRICS,
+            default=SIMILARITY_METRIC,
+            help="Мера сходства.",
+        )
+
+    def handle(self, *args, **options):
+        recipes_count, neighbours_count = build_similarity(
+            top_k=options["top_k"],
+            block_size=options["block_size"],
+            metric=options["metric"],
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Обработано рецептов: {recipes_count}, "
+                f"сохранено пар: {neighbours_count}"
+            )
+        )
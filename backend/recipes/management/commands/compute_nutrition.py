@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from recipes.constants import NUTRITION_BATCH_SIZE
+from recipes.nutrition import compute_nutrition
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает калорийность и БЖУ всех рецептов."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=NUTRITION_BATCH_SIZE,
+            help="Размер пакета при сохранении рецептов.",
+        )
+
+    def handle(self, *args, **options):
+        count = compute_nutrition(batch_size=options["batch_size"])
+        self.stdout.write(
+            self.style.SUCCESS(f"Пересчитана пищевая ценность рецептов: {count}")
+        )
@@ -0,0 +1,50 @@
+import sys
+from django.core.management.base import BaseCommand, CommandError
+from recipes.constants import EXPORT_CHUNK_SIZE
+from recipes.export import gzip_stream, iter_recipes_ndjson, parse_since
+
+
+class Command(BaseCommand):
+    help = "Выгружает рецепты с авторами и ингредиентами в формате NDJSON."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "-o", "--output", help="Файл для выгрузки (по умолчанию stdout)."
+        )
+        parser.add_argument(
+            "--gzip", action="store_true", help="Сжать выгрузку в gzip."
+        )
+        parser.add_argument(
+            "--since",
+            help="Выгрузить только рецепты, измененные после этого момента (ISO 8601).",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=EXPORT_CHUNK_SIZE,
+            help="Количество рецептов, читаемых из базы за один раз.",
+        )
+
+    def handle(self, *args, **options):
+        since = None
+        if options["since"]:
+            try:
+                since = parse_since(options["since"])
+            except ValueError as error:
+                raise CommandError(error)
+        chunks = iter_recipes_ndjson(since=since, chunk_size=options["chunk_size"])
+        if options["gzip"]:
+            chunks = gzip_stream(chunks)
+        output = (
+            open(options["output"], "wb") if options["output"] else sys.stdout.buffer
+        )
+        try:
+            for chunk in chunks:
+                output.write(chunk)
+        finally:
+            if options["output"]:
+                output.close()
+        if options["output"]:
+            self.stdout.write(
+                self.style.SUCCESS(f"Выгрузка завершена: {options['output']}")
+            )
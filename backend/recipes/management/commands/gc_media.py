@@ -0,0 +1,97 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import connections
+from foodgram.storage import get_reference_fields
+from recipes.constants import GC_MEDIA_MIN_AGE_HOURS
+
+
+class Command(BaseCommand):
+    help = "Удаляет медиафайлы, на которые не ссылается ни одна запись в базе."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Только показать файлы без ссылок, ничего не удаляя.",
+        )
+        parser.add_argument(
+            "--min-age",
+            type=float,
+            default=GC_MEDIA_MIN_AGE_HOURS,
+            help="Не трогать файлы моложе указанного числа часов.",
+        )
+
+    def collect_references(self):
+        try:
+            referenced = set()
+            for model, field_name in get_reference_fields():
+                referenced.update(
+                    model._base_manager.exclude(**{field_name: ""})
+                    .exclude(**{f"{field_name}__isnull": True})
+                    .values_list(field_name, flat=True)
+                    .iterator(chunk_size=5000)
+                )
+            return referenced
+        finally:
+            connections.close_all()
+
+    def scan_files(self, directories, cutoff):
+        files = []
+        stack = [os.path.join(settings.MEDIA_ROOT, path) for path in directories]
+        while stack:
+            try:
+                entries = list(os.scandir(stack.pop()))
+            except FileNotFoundError:
+                continue
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                    continue
+                stat = entry.stat(follow_symlinks=False)
+                if stat.st_mtime < cutoff:
+                    name = os.path.relpath(entry.path, settings.MEDIA_ROOT)
+                    files.append((name.replace(os.sep, "/"), stat.st_size))
+        return files
+
+    def handle(self, *args, **options):
+        directories = sorted(
+            {
+                model._meta.get_field(field_name).upload_to.strip("/")
+                for model, field_name in get_reference_fields()
+            }
+        )
+        cutoff = time.time() - options["min_age"] * 3600
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            references = executor.submit(self.collect_references)
+            files = executor.submit(self.scan_files, directories, cutoff)
+            referenced = references.result()
+            candidates = files.result()
+        orphans = [(name, size) for name, size in candidates if name not in referenced]
+        if options["dry_run"]:
+            for name, _ in orphans:
+                self.stdout.write(name)
+            self.stdout.write(
+                self.style.WARNING(
+                    f"Файлов без ссылок: {len(orphans)} "
+                    f"({sum(size for _, size in orphans) / 1024:.1f} КБ)"
+                )
+            )
+            return
+        removed = 0
+        freed = 0
+        for name, size in orphans:
+            # Хранилище повторно проверяет ссылки перед удалением.
+            default_storage.delete(name)
+            if not default_storage.exists(name):
+                removed += 1
+                freed += size
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Удалено файлов: {removed} из {len(orphans)} "
+                f"({freed / 1024:.1f} КБ)"
+            )
+        )
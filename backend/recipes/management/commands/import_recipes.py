@@ -0,0 +1,68 @@
+import gzip
+import os
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from recipes.constants import IMPORT_BATCH_SIZE
+from recipes.importer import RecipeImporter
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Загружает рецепты из NDJSON файла пакетами."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="NDJSON файл с рецептами (можно .gz).")
+        parser.add_argument(
+            "--images-dir", help="Папка, относительно которой ищутся изображения."
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=IMPORT_BATCH_SIZE,
+            help="Количество рецептов в одной транзакции.",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count(),
+            help="Количество процессов для обработки изображений (0 - без пула).",
+        )
+        parser.add_argument(
+            "--author", help="Юзернейм автора для записей без поля author."
+        )
+        parser.add_argument(
+            "--checkpoint",
+            help="Файл контрольной точки; при повторном запуске загрузка продолжится с него.",
+        )
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        if not os.path.exists(path):
+            raise CommandError(f"Файл не найден: {path}")
+        default_author = None
+        if options["author"]:
+            default_author = User.objects.filter(username=options["author"]).first()
+            if default_author is None:
+                raise CommandError(f"Пользователь не найден: {options['author']}")
+        importer = RecipeImporter(
+            images_dir=options["images_dir"],
+            batch_size=options["batch_size"],
+            workers=options["workers"],
+            default_author=default_author,
+            checkpoint=options["checkpoint"],
+        )
+        opener = gzip.open if path.endswith(".gz") else open
+        with opener(path, mode="rt", encoding="utf-8") as ndjson_file:
+            importer.run(ndjson_file)
+        for line_number, error in importer.errors:
+            self.stdout.write(self.style.WARNING(f"Строка {line_number}: {error}"))
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Загрузка завершена. Добавлено рецептов: {importer.imported}"
+            )
+        )
+        if importer.errors:
+            self.stdout.write(
+                self.style.WARNING(f"Пропущено записей: {len(importer.errors)}")
+            )
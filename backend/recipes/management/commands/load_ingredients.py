@@ -2,12 +2,23 @@ import csv
 import os
 from django.core.management.base import BaseCommand
 from django.conf import settings
-from recipes.models import Ingredient
+from recipes.catalog import catalog_rebuild_suspended
+from recipes.models import Ingredient, IngredientNutrition
+from recipes.nutrition import NUTRIENTS, compute_nutrition
 
 
 class Command(BaseCommand):
     help = "Загружает ингредиенты из CSV файла (data/ingredients.csv) в базу данных."
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--nutrition",
+            help=(
+                "CSV с пищевой ценностью на единицу измерения: название, "
+                "единица измерения, ккал, белки, жиры, углеводы."
+            ),
+        )
+
     def handle(self, *args, **options):
         file_path = os.path.join(settings.BASE_DIR.parent, "data", "ingredients.csv")
         if not os.path.exists(file_path):
@@ -19,7 +30,9 @@ class Command(BaseCommand):
         loaded_count = 0
         skipped_count = 0
         try:
-            with open(file_path, mode="r", encoding="utf-8") as csv_file:
+            with open(
+                file_path, mode="r", encoding="utf-8"
+            ) as csv_file, catalog_rebuild_suspended():
                 reader = csv.reader(csv_file)
                 for row in reader:
                     if not row:
@@ -77,3 +90,56 @@ class Command(BaseCommand):
             self.stdout.write(
                 self.style.ERROR(f"Произошла ошибка при чтении файла: {e}")
             )
+        if options["nutrition"]:
+            self.load_nutrition(options["nutrition"])
+
+    def load_nutrition(self, path):
+        if not os.path.exists(path):
+            self.stdout.write(self.style.ERROR(f"Файл не найден: {path}"))
+            return
+        # Название не уникально: одно и то же название встречается
+        # с разными единицами измерения.
+        ingredient_ids = {
+            (name, measurement_unit): ingredient_id
+            for ingredient_id, name, measurement_unit in (
+                Ingredient.objects.values_list("id", "name", "measurement_unit")
+            )
+        }
+        rows = {}
+        skipped_count = 0
+        with open(path, mode="r", encoding="utf-8") as csv_file:
+            for row in csv.reader(csv_file):
+                if not row:
+                    continue
+                try:
+                    if len(row) < len(NUTRIENTS) + 2:
+                        raise ValueError("недостаточно столбцов")
+                    ingredient_id = ingredient_ids.get((row[0].strip(), row[1].strip()))
+                    if ingredient_id is None:
+                        raise ValueError("ингредиент не найден")
+                    values = [float(value) for value in row[2 : len(NUTRIENTS) + 2]]
+                except ValueError as error:
+                    self.stdout.write(
+                        self.style.WARNING(f"Пропущена строка {row}: {error}")
+                    )
+                    skipped_count += 1
+                    continue
+                rows[ingredient_id] = IngredientNutrition(
+                    ingredient_id=ingredient_id, **dict(zip(NUTRIENTS, values))
+                )
+        IngredientNutrition.objects.bulk_create(
+            rows.values(),
+            batch_size=1000,
+            update_conflicts=True,
+            unique_fields=["ingredient"],
+            update_fields=NUTRIENTS,
+        )
+        recipes_count = compute_nutrition()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Пищевая ценность загружена для {len(rows)} ингредиентов, "
+                f"пересчитано рецептов: {recipes_count}"
+            )
+        )
+        if skipped_count > 0:
+            self.stdout.write(self.style.WARNING(f"Пропущено строк: {skipped_count}"))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from recipes.constants import PURGE_BATCH_SIZE
+from recipes.deletion import purge_deleted
+
+
+class Command(BaseCommand):
+    help = (
+        "Окончательно удаляет помеченные на удаление рецепты и пользователей "
+        "вместе со связанными записями и файлами."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=PURGE_BATCH_SIZE,
+            help="Сколько строк удалять за одну транзакцию.",
+        )
+
+    def handle(self, *args, **options):
+        recipes, users = purge_deleted(options["batch_size"])
+        self.stdout.write(
+            self.style.SUCCESS(f"Удалено рецептов: {recipes}, пользователей: {users}")
+        )
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from recipes.trending import refresh_trending
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает затухающую популярность рецептов и кеширует топ."
+
+    def handle(self, *args, **options):
+        refreshed = refresh_trending()
+        self.stdout.write(
+            self.style.SUCCESS(f"Пересчитана популярность рецептов: {refreshed}")
+        )
@@ -0,0 +1,24 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from recipes.changelog import trim_changelog
+from recipes.constants import CHANGELOG_RETENTION_DAYS
+
+
+class Command(BaseCommand):
+    help = (
+        "Удаляет из журнала изменений записи старше заданного числа дней, "
+        "которые уже прочитали все потребители."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=CHANGELOG_RETENTION_DAYS,
+            help="Сколько дней хранить записи журнала.",
+        )
+
+    def handle(self, *args, **options):
+        deleted = trim_changelog(timezone.now() - timedelta(days=options["days"]))
+        self.stdout.write(self.style.SUCCESS(f"Удалено записей журнала: {deleted}"))
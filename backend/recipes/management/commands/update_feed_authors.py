@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from recipes.feed import update_high_fanout_authors
+
+
+class Command(BaseCommand):
+    help = (
+        "Пересчитывает авторов, чьи рецепты подмешиваются в ленту при чтении, "
+        "и раскладывает по лентам последние рецепты тех, кто из них выбыл."
+    )
+
+    def handle(self, *args, **options):
+        promoted, demoted = update_high_fanout_authors()
+        self.stdout.write(
+            self.style.SUCCESS(
+                "Авторов, подмешиваемых при чтении: "
+                f"добавлено {promoted}, исключено {demoted}"
+            )
+        )
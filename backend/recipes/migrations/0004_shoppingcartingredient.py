@@ -0,0 +1,86 @@
+# Generated by Django 5.2.2 on 2026-10-19 10:15
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+def fill_shopping_cart_summary(apps, schema_editor):
+    RecipeIngredient = apps.get_model("recipes", "RecipeIngredient")
+    ShoppingCartIngredient = apps.get_model("recipes", "ShoppingCartIngredient")
+    totals = (
+        RecipeIngredient.objects.filter(recipe__in_shopping_cart_of__isnull=False)
+        .values("recipe__in_shopping_cart_of__user_id", "ingredient_id")
+        .annotate(total_amount=Sum("amount"))
+        .order_by()
+    )
+    ShoppingCartIngredient.objects.bulk_create(
+        (
+            ShoppingCartIngredient(
+                user_id=item["recipe__in_shopping_cart_of__user_id"],
+                ingredient_id=item["ingredient_id"],
+                total_amount=item["total_amount"],
+            )
+            for item in totals.iterator()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0003_alter_recipeingredient_options_and_more"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ShoppingCartIngredient",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "total_amount",
+                    models.IntegerField(default=0, verbose_name="Общее количество"),
+                ),
+                (
+                    "ingredient",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="recipes.ingredient",
+                        verbose_name="Ингредиент",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="shopping_cart_summary",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Пользователь",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Ингредиент в списке покупок",
+                "verbose_name_plural": "Ингредиенты в списках покупок",
+                "ordering": ("user", "ingredient"),
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("user", "ingredient"),
+                        name="unique_user_cart_ingredient",
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(fill_shopping_cart_summary, migrations.RunPython.noop),
+    ]
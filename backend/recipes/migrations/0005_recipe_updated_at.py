@@ -0,0 +1,27 @@
+# Generated by Django 5.2.2 on 2026-10-19 10:17
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def copy_pub_date(apps, schema_editor):
+    Recipe = apps.get_model("recipes", "Recipe")
+    Recipe.objects.update(updated_at=F("pub_date"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0004_shoppingcartingredient"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="recipe",
+            name="updated_at",
+            field=models.DateTimeField(
+                auto_now=True, db_index=True, verbose_name="Дата изменения"
+            ),
+        ),
+        migrations.RunPython(copy_pub_date, migrations.RunPython.noop),
+    ]
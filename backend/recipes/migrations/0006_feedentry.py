@@ -0,0 +1,101 @@
+# Generated by Django 5.2.2 on 2026-10-19 10:19
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+FEED_FANOUT_MAX_FOLLOWERS = 1000
+FEED_BACKFILL_SIZE = 100
+
+
+def fill_feeds(apps, schema_editor):
+    Follow = apps.get_model("recipes", "Follow")
+    Recipe = apps.get_model("recipes", "Recipe")
+    FeedEntry = apps.get_model("recipes", "FeedEntry")
+    high_fanout_authors = set(
+        Follow.objects.values("author")
+        .annotate(followers=Count("id"))
+        .filter(followers__gt=FEED_FANOUT_MAX_FOLLOWERS)
+        .values_list("author", flat=True)
+    )
+    for user_id, author_id in Follow.objects.exclude(
+        author_id__in=high_fanout_authors
+    ).values_list("user_id", "author_id"):
+        recipes = Recipe.objects.filter(author_id=author_id).order_by("-pub_date")
+        FeedEntry.objects.bulk_create(
+            FeedEntry(user_id=user_id, recipe_id=recipe_id, pub_date=pub_date)
+            for recipe_id, pub_date in recipes.values_list("id", "pub_date")[
+                :FEED_BACKFILL_SIZE
+            ]
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0005_recipe_updated_at"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="FeedEntry",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("pub_date", models.DateTimeField(verbose_name="Дата публикации")),
+            ],
+            options={
+                "verbose_name": "Запись ленты",
+                "verbose_name_plural": "Записи ленты",
+                "ordering": ("-pub_date", "-recipe"),
+            },
+        ),
+        migrations.AddIndex(
+            model_name="recipe",
+            index=models.Index(
+                fields=["author", "-pub_date", "-id"], name="recipe_author_pub_date_idx"
+            ),
+        ),
+        migrations.AddField(
+            model_name="feedentry",
+            name="recipe",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="feed_entries",
+                to="recipes.recipe",
+                verbose_name="Рецепт",
+            ),
+        ),
+        migrations.AddField(
+            model_name="feedentry",
+            name="user",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="feed_entries",
+                to=settings.AUTH_USER_MODEL,
+                verbose_name="Подписчик",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="feedentry",
+            index=models.Index(
+                fields=["user", "-pub_date", "-recipe"], name="feed_user_pub_date_idx"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="feedentry",
+            constraint=models.UniqueConstraint(
+                fields=("user", "recipe"), name="unique_user_feed_recipe"
+            ),
+        ),
+        migrations.RunPython(fill_feeds, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 5.2.2 on 2026-10-19 10:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0006_feedentry"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RecipeSimilarity",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("score", models.FloatField(verbose_name="Сходство")),
+                (
+                    "recipe",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="similarities",
+                        to="recipes.recipe",
+                        verbose_name="Рецепт",
+                    ),
+                ),
+                (
+                    "similar",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="recipes.recipe",
+                        verbose_name="Похожий рецепт",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Похожий рецепт",
+                "verbose_name_plural": "Похожие рецепты",
+                "ordering": ("recipe", "-score"),
+                "indexes": [
+                    models.Index(
+                        fields=["recipe", "-score"], name="similarity_recipe_score_idx"
+                    )
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("recipe", "similar"), name="unique_recipe_similar"
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.2.2 on 2026-10-19 10:21
+
+import math
+from django.db import migrations, models
+from django.utils import timezone
+
+DECAY_RATE = math.log(2) / (24 * 3600)
+
+
+def fill_trending_scores(apps, schema_editor):
+    Recipe = apps.get_model("recipes", "Recipe")
+    now = timezone.now()
+    scores = {}
+    for model_name, weight in (("Favorite", 1.0), ("ShoppingCart", 0.5)):
+        model = apps.get_model("recipes", model_name)
+        for recipe_id, date_added in model.objects.values_list(
+            "recipe_id", "date_added"
+        ).iterator():
+            age = max((now - date_added).total_seconds(), 0)
+            scores[recipe_id] = scores.get(recipe_id, 0) + weight * math.exp(
+                -DECAY_RATE * age
+            )
+    Recipe.objects.bulk_update(
+        [
+            Recipe(id=recipe_id, trending_score=score, trending_updated_at=now)
+            for recipe_id, score in scores.items()
+        ],
+        ["trending_score", "trending_updated_at"],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0007_recipesimilarity"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="recipe",
+            name="trending_score",
+            field=models.FloatField(
+                db_index=True, default=0, verbose_name="Популярность"
+            ),
+        ),
+        migrations.AddField(
+            model_name="recipe",
+            name="trending_updated_at",
+            field=models.DateTimeField(
+                blank=True, null=True, verbose_name="Дата пересчета популярности"
+            ),
+        ),
+        migrations.RunPython(fill_trending_scores, migrations.RunPython.noop),
+    ]
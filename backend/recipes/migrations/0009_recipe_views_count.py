@@ -0,0 +1,20 @@
+# Generated by Django 5.2.2 on 2026-10-19 10:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0008_recipe_trending"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="recipe",
+            name="views_count",
+            field=models.PositiveIntegerField(
+                db_index=True, default=0, verbose_name="Просмотры"
+            ),
+        ),
+    ]
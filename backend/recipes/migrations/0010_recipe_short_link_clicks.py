@@ -0,0 +1,20 @@
+# Generated by Django 5.2.2 on 2026-10-19 10:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0009_recipe_views_count"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="recipe",
+            name="short_link_clicks",
+            field=models.PositiveIntegerField(
+                default=0, verbose_name="Переходы по короткой ссылке"
+            ),
+        ),
+    ]
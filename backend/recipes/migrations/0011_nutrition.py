@@ -0,0 +1,72 @@
+# Generated by Django 5.2.2 on 2026-10-19 10:36
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0010_recipe_short_link_clicks"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="IngredientNutrition",
+            fields=[
+                (
+                    "ingredient",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="nutrition",
+                        serialize=False,
+                        to="recipes.ingredient",
+                        verbose_name="Ингредиент",
+                    ),
+                ),
+                (
+                    "kcal",
+                    models.FloatField(default=0, verbose_name="Калории на единицу"),
+                ),
+                (
+                    "protein",
+                    models.FloatField(default=0, verbose_name="Белки на единицу, г"),
+                ),
+                (
+                    "fat",
+                    models.FloatField(default=0, verbose_name="Жиры на единицу, г"),
+                ),
+                (
+                    "carbs",
+                    models.FloatField(default=0, verbose_name="Углеводы на единицу, г"),
+                ),
+            ],
+            options={
+                "verbose_name": "Пищевая ценность ингредиента",
+                "verbose_name_plural": "Пищевая ценность ингредиентов",
+            },
+        ),
+        migrations.AddField(
+            model_name="recipe",
+            name="carbs",
+            field=models.FloatField(
+                db_index=True, default=0, verbose_name="Углеводы, г"
+            ),
+        ),
+        migrations.AddField(
+            model_name="recipe",
+            name="fat",
+            field=models.FloatField(db_index=True, default=0, verbose_name="Жиры, г"),
+        ),
+        migrations.AddField(
+            model_name="recipe",
+            name="kcal",
+            field=models.FloatField(db_index=True, default=0, verbose_name="Калории"),
+        ),
+        migrations.AddField(
+            model_name="recipe",
+            name="protein",
+            field=models.FloatField(db_index=True, default=0, verbose_name="Белки, г"),
+        ),
+    ]
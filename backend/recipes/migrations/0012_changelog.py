@@ -0,0 +1,85 @@
+# Generated by Django 5.2.2 on 2026-10-19 10:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0011_nutrition"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ChangeLogEntry",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("model", models.CharField(max_length=100, verbose_name="Модель")),
+                ("object_id", models.BigIntegerField(verbose_name="ID объекта")),
+                (
+                    "action",
+                    models.CharField(
+                        choices=[
+                            ("create", "Создание"),
+                            ("update", "Изменение"),
+                            ("delete", "Удаление"),
+                        ],
+                        max_length=10,
+                        verbose_name="Действие",
+                    ),
+                ),
+                (
+                    "data",
+                    models.JSONField(default=dict, verbose_name="Связанные объекты"),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(
+                        auto_now_add=True, verbose_name="Дата изменения"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Запись журнала изменений",
+                "verbose_name_plural": "Журнал изменений",
+                "ordering": ("id",),
+            },
+        ),
+        migrations.CreateModel(
+            name="ConsumerOffset",
+            fields=[
+                (
+                    "consumer",
+                    models.CharField(
+                        max_length=100,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="Потребитель",
+                    ),
+                ),
+                (
+                    "last_id",
+                    models.BigIntegerField(
+                        default=0, verbose_name="Последняя обработанная запись"
+                    ),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(auto_now=True, verbose_name="Дата обновления"),
+                ),
+            ],
+            options={
+                "verbose_name": "Позиция потребителя журнала",
+                "verbose_name_plural": "Позиции потребителей журнала",
+                "ordering": ("consumer",),
+            },
+        ),
+    ]
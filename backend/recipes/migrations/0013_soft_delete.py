@@ -0,0 +1,20 @@
+# Generated by Django 5.2.2 on 2026-10-19 10:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0012_changelog"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="recipe",
+            name="deleted_at",
+            field=models.DateTimeField(
+                blank=True, db_index=True, null=True, verbose_name="Дата удаления"
+            ),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.2 on 2026-10-19 11:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0013_soft_delete"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="recipe",
+            name="image",
+            field=models.ImageField(
+                db_index=True, upload_to="recipes/images/", verbose_name="Картинка"
+            ),
+        ),
+    ]
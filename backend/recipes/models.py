@@ -1,4 +1,5 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F
 from django.conf import settings
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.core.exceptions import ValidationError
@@ -18,6 +19,27 @@ class Ingredient(models.Model):
         return f"{self.name}, {self.measurement_unit}"
 
 
+class IngredientNutrition(models.Model):
+    ingredient = models.OneToOneField(
+        Ingredient,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="nutrition",
+        verbose_name="Ингредиент",
+    )
+    kcal = models.FloatField("Калории на единицу", default=0)
+    protein = models.FloatField("Белки на единицу, г", default=0)
+    fat = models.FloatField("Жиры на единицу, г", default=0)
+    carbs = models.FloatField("Углеводы на единицу, г", default=0)
+
+    class Meta:
+        verbose_name = "Пищевая ценность ингредиента"
+        verbose_name_plural = "Пищевая ценность ингредиентов"
+
+    def __str__(self):
+        return f"{self.ingredient}: {self.kcal} ккал"
+
+
 class Tag(models.Model):
     name = models.CharField("Название тега", max_length=200, unique=True)
     color = models.CharField(
@@ -34,6 +56,13 @@ class Tag(models.Model):
         return self.name
 
 
+class NotDeletedManager(models.Manager):
+    # Записи, помеченные на удаление, скрыты до фоновой очистки.
+
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at__isnull=True)
+
+
 class Recipe(models.Model):
     author = models.ForeignKey(
         settings.AUTH_USER_MODEL,
@@ -42,7 +71,7 @@ class Recipe(models.Model):
         verbose_name="Автор рецепта",
     )
     name = models.CharField("Название рецепта", max_length=200)
-    image = models.ImageField("Картинка", upload_to="recipes/images/")
+    image = models.ImageField("Картинка", upload_to="recipes/images/", db_index=True)
     text = models.TextField("Описание рецепта")
     ingredients = models.ManyToManyField(
         Ingredient,
@@ -59,11 +88,35 @@ class Recipe(models.Model):
         ],
     )
     pub_date = models.DateTimeField("Дата публикации", auto_now_add=True)
+    updated_at = models.DateTimeField("Дата изменения", auto_now=True, db_index=True)
+    trending_score = models.FloatField("Популярность", default=0, db_index=True)
+    trending_updated_at = models.DateTimeField(
+        "Дата пересчета популярности", null=True, blank=True
+    )
+    views_count = models.PositiveIntegerField("Просмотры", default=0, db_index=True)
+    short_link_clicks = models.PositiveIntegerField(
+        "Переходы по короткой ссылке", default=0
+    )
+    kcal = models.FloatField("Калории", default=0, db_index=True)
+    protein = models.FloatField("Белки, г", default=0, db_index=True)
+    fat = models.FloatField("Жиры, г", default=0, db_index=True)
+    carbs = models.FloatField("Углеводы, г", default=0, db_index=True)
+    deleted_at = models.DateTimeField(
+        "Дата удаления", null=True, blank=True, db_index=True
+    )
+
+    objects = NotDeletedManager()
+    all_objects = models.Manager()
 
     class Meta:
         verbose_name = "Рецепт"
         verbose_name_plural = "Рецепты"
         ordering = ("-pub_date",)
+        indexes = [
+            models.Index(
+                fields=["author", "-pub_date", "-id"], name="recipe_author_pub_date_idx"
+            )
+        ]
 
     def __str__(self):
         return self.name
@@ -193,3 +246,215 @@ class Follow(models.Model):
 
     def __str__(self):
         return f"{self.user} подписан на {self.author}"
+
+
+class HighFanoutAuthor(models.Model):
+    author = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="high_fanout",
+        verbose_name="Автор",
+    )
+
+    class Meta:
+        verbose_name = "Автор, подмешиваемый в ленту при чтении"
+        verbose_name_plural = "Авторы, подмешиваемые в ленту при чтении"
+
+    def __str__(self):
+        return str(self.author)
+
+
+class FeedEntry(models.Model):
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="feed_entries",
+        verbose_name="Подписчик",
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name="feed_entries",
+        verbose_name="Рецепт",
+    )
+    pub_date = models.DateTimeField("Дата публикации")
+
+    class Meta:
+        verbose_name = "Запись ленты"
+        verbose_name_plural = "Записи ленты"
+        ordering = ("-pub_date", "-recipe")
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "recipe"], name="unique_user_feed_recipe"
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=["user", "-pub_date", "-recipe"], name="feed_user_pub_date_idx"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.recipe} в ленте {self.user}"
+
+
+class RecipeSimilarity(models.Model):
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name="similarities",
+        verbose_name="Рецепт",
+    )
+    similar = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name="+",
+        verbose_name="Похожий рецепт",
+    )
+    score = models.FloatField("Сходство")
+
+    class Meta:
+        verbose_name = "Похожий рецепт"
+        verbose_name_plural = "Похожие рецепты"
+        ordering = ("recipe", "-score")
+        constraints = [
+            models.UniqueConstraint(
+                fields=["recipe", "similar"], name="unique_recipe_similar"
+            )
+        ]
+        indexes = [
+            models.Index(fields=["recipe", "-score"], name="similarity_recipe_score_idx")
+        ]
+
+    def __str__(self):
+        return f"{self.recipe} ~ {self.similar}: {self.score:.3f}"
+
+
+class ShoppingCartIngredientManager(models.Manager):
+
+    def apply_deltas(self, user_ids, deltas):
+        deltas = {
+            ingredient_id: delta for ingredient_id, delta in deltas.items() if delta
+        }
+        user_ids = list(user_ids)
+        if not user_ids or not deltas:
+            return
+        with transaction.atomic():
+            # Недостающие строки вставляются с нулем и без ошибки при
+            # конфликте, а сами суммы меняются только через UPDATE с F():
+            # параллельные добавления одного ингредиента не теряются и не
+            # падают на уникальности пары пользователь-ингредиент.
+            self.bulk_create(
+                (
+                    self.model(
+                        user_id=user_id, ingredient_id=ingredient_id, total_amount=0
+                    )
+                    for user_id in user_ids
+                    for ingredient_id, delta in deltas.items()
+                    if delta > 0
+                ),
+                ignore_conflicts=True,
+            )
+            for ingredient_id, delta in sorted(deltas.items()):
+                self.filter(user_id__in=user_ids, ingredient_id=ingredient_id).update(
+                    total_amount=F("total_amount") + delta
+                )
+            self.filter(
+                user_id__in=user_ids, ingredient_id__in=deltas, total_amount__lte=0
+            ).delete()
+
+    def _recipe_amounts(self, recipe_id):
+        return dict(
+            RecipeIngredient.objects.filter(recipe_id=recipe_id).values_list(
+                "ingredient_id", "amount"
+            )
+        )
+
+    def add_recipe(self, user_id, recipe_id):
+        self.apply_deltas([user_id], self._recipe_amounts(recipe_id))
+
+    def remove_recipe(self, user_id, recipe_id):
+        amounts = self._recipe_amounts(recipe_id)
+        self.apply_deltas(
+            [user_id],
+            {ingredient_id: -amount for ingredient_id, amount in amounts.items()},
+        )
+
+    def remove_recipe_from_carts(self, recipe):
+        amounts = self._recipe_amounts(recipe.id)
+        self.apply_recipe_deltas(
+            recipe,
+            {ingredient_id: -amount for ingredient_id, amount in amounts.items()},
+        )
+
+    def apply_recipe_deltas(self, recipe, deltas):
+        user_ids = ShoppingCart.objects.filter(recipe=recipe).values_list(
+            "user_id", flat=True
+        )
+        self.apply_deltas(user_ids, deltas)
+
+
+class ShoppingCartIngredient(models.Model):
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="shopping_cart_summary",
+        verbose_name="Пользователь",
+    )
+    ingredient = models.ForeignKey(
+        Ingredient, on_delete=models.CASCADE, verbose_name="Ингредиент"
+    )
+    total_amount = models.IntegerField("Общее количество", default=0)
+
+    objects = ShoppingCartIngredientManager()
+
+    class Meta:
+        verbose_name = "Ингредиент в списке покупок"
+        verbose_name_plural = "Ингредиенты в списках покупок"
+        ordering = ("user", "ingredient")
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "ingredient"], name="unique_user_cart_ingredient"
+            )
+        ]
+
+    def __str__(self):
+        return (
+            f"{self.user}: {self.ingredient.name} - {self.total_amount} "
+            f"{self.ingredient.measurement_unit}"
+        )
+
+
+class ChangeLogEntry(models.Model):
+    CREATE = "create"
+    UPDATE = "update"
+    DELETE = "delete"
+    ACTIONS = ((CREATE, "Создание"), (UPDATE, "Изменение"), (DELETE, "Удаление"))
+
+    model = models.CharField("Модель", max_length=100)
+    object_id = models.BigIntegerField("ID объекта")
+    action = models.CharField("Действие", max_length=10, choices=ACTIONS)
+    data = models.JSONField("Связанные объекты", default=dict)
+    created_at = models.DateTimeField("Дата изменения", auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Запись журнала изменений"
+        verbose_name_plural = "Журнал изменений"
+        ordering = ("id",)
+
+    def __str__(self):
+        return f"#{self.id} {self.action} {self.model}:{self.object_id}"
+
+
+class ConsumerOffset(models.Model):
+    consumer = models.CharField("Потребитель", max_length=100, primary_key=True)
+    last_id = models.BigIntegerField("Последняя обработанная запись", default=0)
+    updated_at = models.DateTimeField("Дата обновления", auto_now=True)
+
+    class Meta:
+        verbose_name = "Позиция потребителя журнала"
+        verbose_name_plural = "Позиции потребителей журнала"
+        ordering = ("consumer",)
+
+    def __str__(self):
+        return f"{self.consumer}: {self.last_id}"
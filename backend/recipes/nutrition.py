@@ -0,0 +1,113 @@
+from django.db import transaction
+from django.db.models import F, FloatField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Round
+from .changelog import record_change, record_changes
+from .constants import NUTRITION_BATCH_SIZE
+from .models import ChangeLogEntry, IngredientNutrition, Recipe, RecipeIngredient
+
+NUTRIENTS = ("kcal", "protein", "fat", "carbs")
+
+
+def compute_nutrition(recipe_ids=None, batch_size=NUTRITION_BATCH_SIZE):
+    # Итоги считаются одним умножением разреженной матрицы «рецепт × ингредиент»
+    # (количества) на матрицу «ингредиент × нутриент» (значения на единицу).
+    import numpy as np
+    from scipy import sparse
+
+    nutrition = np.array(
+        list(
+            IngredientNutrition.objects.order_by("ingredient_id").values_list(
+                "ingredient_id", *NUTRIENTS
+            )
+        ),
+        dtype=np.float64,
+    ).reshape(-1, len(NUTRIENTS) + 1)
+    ingredient_ids = nutrition[:, 0].astype(np.int64)
+    pairs_queryset = RecipeIngredient.objects.order_by()
+    if recipe_ids is not None:
+        pairs_queryset = pairs_queryset.filter(recipe_id__in=recipe_ids)
+    pairs = np.array(
+        list(
+            pairs_queryset.values_list("recipe_id", "ingredient_id", "amount").iterator(
+                chunk_size=10000
+            )
+        ),
+        dtype=np.int64,
+    ).reshape(-1, 3)
+    all_recipe_ids = pairs[:, 0]
+    if recipe_ids is not None:
+        all_recipe_ids = np.concatenate(
+            (all_recipe_ids, np.array(list(recipe_ids), dtype=np.int64))
+        )
+    recipe_index, rows = np.unique(all_recipe_ids, return_inverse=True)
+    rows = rows[: len(pairs)]
+    positions = np.searchsorted(ingredient_ids, pairs[:, 1])
+    known = positions < len(ingredient_ids)
+    known[known] = ingredient_ids[positions[known]] == pairs[known, 1]
+    amounts = sparse.csr_matrix(
+        (pairs[known, 2].astype(np.float64), (rows[known], positions[known])),
+        shape=(len(recipe_index), len(ingredient_ids)),
+    )
+    totals = np.round(amounts @ nutrition[:, 1:], 1)
+    recipes = [
+        Recipe(id=int(recipe_id), **dict(zip(NUTRIENTS, map(float, values))))
+        for recipe_id, values in zip(recipe_index, totals)
+    ]
+    with transaction.atomic():
+        Recipe.objects.bulk_update(recipes, NUTRIENTS, batch_size=batch_size)
+        record_changes(recipes, ChangeLogEntry.UPDATE)
+    return len(recipes)
+
+
+def update_recipe_nutrition(recipe):
+    totals = RecipeIngredient.objects.filter(recipe=recipe).aggregate(
+        **{
+            nutrient: Sum(F("amount") * F(f"ingredient__nutrition__{nutrient}"))
+            for nutrient in NUTRIENTS
+        }
+    )
+    for nutrient in NUTRIENTS:
+        setattr(recipe, nutrient, round(totals[nutrient] or 0, 1))
+    with transaction.atomic():
+        Recipe.objects.filter(pk=recipe.pk).update(
+            **{nutrient: getattr(recipe, nutrient) for nutrient in NUTRIENTS}
+        )
+        record_change(recipe, ChangeLogEntry.UPDATE)
+
+
+def update_ingredient_recipes_nutrition(ingredient_id, batch_size=NUTRITION_BATCH_SIZE):
+    # Один UPDATE с подзапросами: рецепты популярного ингредиента не
+    # передаются списком параметров и не упираются в лимит SQLite.
+    recipes = Recipe.objects.filter(
+        pk__in=RecipeIngredient.objects.filter(ingredient_id=ingredient_id).values(
+            "recipe_id"
+        )
+    )
+    totals = {
+        nutrient: Round(
+            Coalesce(
+                Subquery(
+                    RecipeIngredient.objects.filter(recipe_id=OuterRef("pk"))
+                    .values("recipe_id")
+                    .annotate(
+                        total=Sum(F("amount") * F(f"ingredient__nutrition__{nutrient}"))
+                    )
+                    .values("total"),
+                    output_field=FloatField(),
+                ),
+                Value(0.0),
+            ),
+            1,
+        )
+        for nutrient in NUTRIENTS
+    }
+    with transaction.atomic():
+        updated = recipes.update(**totals)
+        batch = []
+        for recipe in recipes.only("id", "author_id").iterator(chunk_size=batch_size):
+            batch.append(recipe)
+            if len(batch) >= batch_size:
+                record_changes(batch, ChangeLogEntry.UPDATE)
+                batch = []
+        record_changes(batch, ChangeLogEntry.UPDATE)
+    return updated
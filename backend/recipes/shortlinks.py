@@ -0,0 +1,60 @@
+import string
+from django.conf import settings
+from django.core.cache import caches
+from .constants import SHORT_LINK_CACHE_TIMEOUT, SHORT_LINK_MISS_CACHE_TIMEOUT
+from .models import Recipe
+
+ALPHABET = string.digits + string.ascii_letters
+SHORT_LINK_CACHE_KEY = "shortlinks:recipe:{}"
+
+
+def encode_short_code(recipe_id):
+    if recipe_id < 0:
+        raise ValueError("Идентификатор рецепта не может быть отрицательным.")
+    code = ""
+    while True:
+        recipe_id, remainder = divmod(recipe_id, len(ALPHABET))
+        code = ALPHABET[remainder] + code
+        if not recipe_id:
+            return code
+
+
+def decode_short_code(code):
+    recipe_id = 0
+    for char in code:
+        position = ALPHABET.find(char)
+        if position < 0:
+            raise ValueError(f"Недопустимый символ в коде: {char}")
+        recipe_id = recipe_id * len(ALPHABET) + position
+    if not code or encode_short_code(recipe_id) != code:
+        raise ValueError(f"Некорректный код: {code}")
+    return recipe_id
+
+
+def recipe_exists(recipe_id):
+    # Отсутствующие рецепты тоже кешируются, но на короткое время,
+    # чтобы перебор кодов не нагружал базу. Кеш общий для воркеров,
+    # иначе forget_recipe сбрасывал бы только копию своего процесса.
+    cache = caches[settings.SHARED_CACHE_ALIAS]
+    cache_key = SHORT_LINK_CACHE_KEY.format(recipe_id)
+    exists = cache.get(cache_key)
+    if exists is None:
+        exists = Recipe.objects.filter(pk=recipe_id).exists()
+        cache.set(
+            cache_key,
+            exists,
+            SHORT_LINK_CACHE_TIMEOUT if exists else SHORT_LINK_MISS_CACHE_TIMEOUT,
+        )
+    return exists
+
+
+def resolve_short_code(code):
+    try:
+        recipe_id = decode_short_code(code)
+    except ValueError:
+        return None
+    return recipe_id if recipe_exists(recipe_id) else None
+
+
+def forget_recipe(recipe_id):
+    caches[settings.SHARED_CACHE_ALIAS].delete(SHORT_LINK_CACHE_KEY.format(recipe_id))
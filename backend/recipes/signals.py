@@ -0,0 +1,122 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from foodgram.storage import (
+    delete_file_on_commit,
+    release_replaced_file,
+    remember_replaced_file,
+)
+from .catalog import schedule_catalog_rebuild
+from .changelog import TRACKED_MODELS, record_change
+from .constants import TRENDING_FAVORITE_WEIGHT, TRENDING_SHOPPING_CART_WEIGHT
+from .feed import backfill_feed, fan_out_recipes, remove_author_from_feed
+from .models import (
+    ChangeLogEntry,
+    Favorite,
+    Follow,
+    Ingredient,
+    IngredientNutrition,
+    Recipe,
+    ShoppingCart,
+    ShoppingCartIngredient,
+)
+from .nutrition import update_ingredient_recipes_nutrition
+from .shortlinks import forget_recipe
+from .trending import bump_trending
+
+
+@receiver(post_save, sender=ShoppingCart)
+def add_recipe_to_cart_summary(sender, instance, created, **kwargs):
+    if created:
+        ShoppingCartIngredient.objects.add_recipe(instance.user_id, instance.recipe_id)
+        bump_trending(instance.recipe_id, TRENDING_SHOPPING_CART_WEIGHT)
+
+
+@receiver(pre_delete, sender=ShoppingCart)
+def remove_recipe_from_cart_summary(sender, instance, **kwargs):
+    # Помеченный на удаление рецепт вычтен из сводки еще при пометке.
+    if not Recipe.all_objects.filter(
+        pk=instance.recipe_id, deleted_at__isnull=False
+    ).exists():
+        ShoppingCartIngredient.objects.remove_recipe(
+            instance.user_id, instance.recipe_id
+        )
+
+
+@receiver(post_save, sender=Favorite)
+def bump_favorite_trending(sender, instance, created, **kwargs):
+    if created:
+        bump_trending(instance.recipe_id, TRENDING_FAVORITE_WEIGHT)
+
+
+@receiver(post_save, sender=Recipe)
+def publish_recipe_to_feeds(sender, instance, created, **kwargs):
+    if created:
+        forget_recipe(instance.pk)
+        transaction.on_commit(lambda: fan_out_recipes([instance]))
+
+
+@receiver(post_delete, sender=Recipe)
+def forget_recipe_short_link(sender, instance, **kwargs):
+    forget_recipe(instance.pk)
+
+
+@receiver(pre_save, sender=Recipe)
+def remember_replaced_recipe_image(sender, instance, update_fields=None, **kwargs):
+    remember_replaced_file(instance, "image", update_fields)
+
+
+@receiver(post_save, sender=Recipe)
+def release_replaced_recipe_image(sender, instance, **kwargs):
+    release_replaced_file(instance, "image")
+
+
+@receiver(post_delete, sender=Recipe)
+def release_recipe_image(sender, instance, **kwargs):
+    delete_file_on_commit(instance.image.storage, instance.image.name)
+
+
+@receiver(post_save, sender=Follow)
+def backfill_follower_feed(sender, instance, created, **kwargs):
+    if created:
+        backfill_feed(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def trim_follower_feed(sender, instance, **kwargs):
+    remove_author_from_feed(instance.user_id, instance.author_id)
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def rebuild_ingredient_catalog(sender, **kwargs):
+    schedule_catalog_rebuild()
+
+
+@receiver(post_save, sender=IngredientNutrition)
+@receiver(post_delete, sender=IngredientNutrition)
+def recompute_recipe_nutrition(sender, instance, **kwargs):
+    ingredient_id = instance.ingredient_id
+    transaction.on_commit(lambda: update_ingredient_recipes_nutrition(ingredient_id))
+
+
+def record_saved_change(
+    sender, instance, created, raw=False, update_fields=None, **kwargs
+):
+    # Вход пользователя обновляет только last_login вне транзакции; такие
+    # сохранения потребителям журнала не интересны.
+    if not raw and update_fields != frozenset({"last_login"}):
+        record_change(
+            instance, ChangeLogEntry.CREATE if created else ChangeLogEntry.UPDATE
+        )
+
+
+def record_deleted_change(sender, instance, **kwargs):
+    # Об удалении помеченных объектов журнал узнал при пометке.
+    if getattr(instance, "deleted_at", None) is None:
+        record_change(instance, ChangeLogEntry.DELETE)
+
+
+for tracked_model in TRACKED_MODELS:
+    post_save.connect(record_saved_change, sender=tracked_model)
+    post_delete.connect(record_deleted_change, sender=tracked_model)
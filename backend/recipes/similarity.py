@@ -0,0 +1,162 @@
+import heapq
+import math
+from django.db import transaction
+from django.db.models import Count, Min, Q
+from .constants import SIMILAR_RECIPES_COUNT, SIMILARITY_BLOCK_SIZE, SIMILARITY_METRIC
+from .models import RecipeIngredient, RecipeSimilarity
+
+METRICS = ("jaccard", "cosine")
+
+
+def similarity_score(intersection, size, other_size, metric=SIMILARITY_METRIC):
+    if metric == "cosine":
+        return intersection / math.sqrt(size * other_size)
+    return intersection / (size + other_size - intersection)
+
+
+def build_similarity(
+    top_k=SIMILAR_RECIPES_COUNT,
+    block_size=SIMILARITY_BLOCK_SIZE,
+    metric=SIMILARITY_METRIC,
+):
+    import numpy as np
+    from scipy import sparse
+
+    pairs = np.array(
+        list(
+            RecipeIngredient.objects.order_by()
+            .values_list("recipe_id", "ingredient_id")
+            .iterator(chunk_size=10000)
+        ),
+        dtype=np.int64,
+    ).reshape(-1, 2)
+    recipe_ids, rows = np.unique(pairs[:, 0], return_inverse=True)
+    _, columns = np.unique(pairs[:, 1], return_inverse=True)
+    matrix = sparse.csr_matrix(
+        (np.ones(len(rows), dtype=np.float32), (rows, columns)),
+        shape=(len(recipe_ids), columns.max() + 1 if len(columns) else 0),
+    )
+    sizes = np.asarray(matrix.sum(axis=1)).ravel()
+    transposed = matrix.T.tocsc()
+    written = 0
+    for start in range(0, len(recipe_ids), block_size):
+        stop = min(start + block_size, len(recipe_ids))
+        overlap = (matrix[start:stop] @ transposed).tocsr()
+        block_rows = np.repeat(np.arange(stop - start), np.diff(overlap.indptr))
+        intersection = overlap.data
+        own_sizes = sizes[block_rows + start]
+        other_sizes = sizes[overlap.indices]
+        if metric == "cosine":
+            scores = intersection / np.sqrt(own_sizes * other_sizes)
+        else:
+            scores = intersection / (own_sizes + other_sizes - intersection)
+        scores[overlap.indices == block_rows + start] = -1
+        order = np.lexsort((overlap.indices, -scores, block_rows))
+        ranks = np.arange(len(order)) - overlap.indptr[block_rows[order]]
+        keep = order[(ranks < top_k) & (scores[order] > 0)]
+        neighbours = [
+            RecipeSimilarity(
+                recipe_id=int(recipe_ids[row + start]),
+                similar_id=int(recipe_ids[column]),
+                score=float(score),
+            )
+            for row, column, score in zip(
+                block_rows[keep], overlap.indices[keep], scores[keep]
+            )
+        ]
+        with transaction.atomic():
+            RecipeSimilarity.objects.filter(
+                recipe_id__in=recipe_ids[start:stop].tolist()
+            ).delete()
+            RecipeSimilarity.objects.bulk_create(neighbours, batch_size=1000)
+        written += len(neighbours)
+    # Рецепты без ингредиентов в матрицу не попали, их старые связи удаляются.
+    RecipeSimilarity.objects.exclude(
+        recipe_id__in=RecipeIngredient.objects.values("recipe_id")
+    ).delete()
+    RecipeSimilarity.objects.exclude(
+        similar_id__in=RecipeIngredient.objects.values("recipe_id")
+    ).delete()
+    return len(recipe_ids), written
+
+
+def update_recipe_similarity(
+    recipe_id, top_k=SIMILAR_RECIPES_COUNT, metric=SIMILARITY_METRIC
+):
+    ingredient_ids = list(
+        RecipeIngredient.objects.filter(recipe_id=recipe_id).values_list(
+            "ingredient_id", flat=True
+        )
+    )
+    if not ingredient_ids:
+        RecipeSimilarity.objects.filter(
+            Q(recipe_id=recipe_id) | Q(similar_id=recipe_id)
+        ).delete()
+        return
+    candidates = (
+        RecipeIngredient.objects.filter(ingredient_id__in=ingredient_ids)
+        .exclude(recipe_id=recipe_id)
+        .values("recipe_id")
+    )
+    scores = {
+        other_id: similarity_score(intersection, len(ingredient_ids), size, metric)
+        for other_id, size, intersection in RecipeIngredient.objects.filter(
+            recipe_id__in=candidates
+        )
+        .values("recipe_id")
+        .annotate(
+            size=Count("id"),
+            intersection=Count("id", filter=Q(ingredient_id__in=ingredient_ids)),
+        )
+        .order_by()
+        .values_list("recipe_id", "size", "intersection")
+    }
+    with transaction.atomic():
+        RecipeSimilarity.objects.filter(recipe_id=recipe_id).delete()
+        RecipeSimilarity.objects.bulk_create(
+            RecipeSimilarity(recipe_id=recipe_id, similar_id=other_id, score=score)
+            for other_id, score in heapq.nlargest(
+                top_k, scores.items(), key=lambda item: (item[1], -item[0])
+            )
+        )
+        RecipeSimilarity.objects.filter(similar_id=recipe_id).exclude(
+            recipe_id__in=list(scores)
+        ).delete()
+        reverse = {
+            row.recipe_id: row
+            for row in RecipeSimilarity.objects.filter(
+                similar_id=recipe_id, recipe_id__in=list(scores)
+            )
+        }
+        for row in reverse.values():
+            row.score = scores[row.recipe_id]
+        RecipeSimilarity.objects.bulk_update(reverse.values(), ["score"])
+        lists = {
+            item["recipe_id"]: item
+            for item in RecipeSimilarity.objects.filter(recipe_id__in=list(scores))
+            .values("recipe_id")
+            .annotate(count=Count("id"), lowest=Min("score"))
+            .order_by()
+        }
+        to_create = []
+        overflowing = []
+        for other_id, score in scores.items():
+            if other_id in reverse:
+                continue
+            neighbours = lists.get(other_id)
+            if neighbours is None or neighbours["count"] < top_k:
+                to_create.append((other_id, score))
+            elif score > neighbours["lowest"]:
+                to_create.append((other_id, score))
+                overflowing.append(other_id)
+        RecipeSimilarity.objects.bulk_create(
+            RecipeSimilarity(recipe_id=other_id, similar_id=recipe_id, score=score)
+            for other_id, score in to_create
+        )
+        for other_id in overflowing:
+            lowest = (
+                RecipeSimilarity.objects.filter(recipe_id=other_id)
+                .order_by("score", "-similar_id")
+                .first()
+            )
+            lowest.delete()
@@ -0,0 +1,86 @@
+import math
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils import timezone
+from .constants import (
+    TRENDING_CACHE_TIMEOUT,
+    TRENDING_HALF_LIFE_HOURS,
+    TRENDING_MIN_SCORE,
+    TRENDING_TOP_COUNT,
+)
+from .models import Recipe
+
+TRENDING_CACHE_KEY = "recipes:trending"
+DECAY_RATE = math.log(2) / (TRENDING_HALF_LIFE_HOURS * 3600)
+
+
+def decay(score, updated_at, now):
+    if not score or updated_at is None:
+        return 0
+    score *= math.exp(-DECAY_RATE * max((now - updated_at).total_seconds(), 0))
+    return score if score >= TRENDING_MIN_SCORE else 0
+
+
+def bump_trending(recipe_id, weight):
+    now = timezone.now()
+    with transaction.atomic():
+        current = (
+            Recipe.objects.select_for_update()
+            .filter(pk=recipe_id)
+            .values_list("trending_score", "trending_updated_at")
+            .first()
+        )
+        if current is None:
+            return
+        Recipe.objects.filter(pk=recipe_id).update(
+            trending_score=decay(*current, now) + weight, trending_updated_at=now
+        )
+
+
+def refresh_trending(batch_size=1000):
+    # Счетчики затухают только при обновлении, поэтому порядок по
+    # trending_score между пересчетами приблизительный.
+    now = timezone.now()
+    batch = []
+    refreshed = 0
+    for recipe_id, score, updated_at in (
+        Recipe.objects.filter(trending_score__gt=0)
+        .values_list("id", "trending_score", "trending_updated_at")
+        .iterator(chunk_size=batch_size)
+    ):
+        batch.append(
+            Recipe(
+                id=recipe_id,
+                trending_score=decay(score, updated_at, now),
+                trending_updated_at=now,
+            )
+        )
+        if len(batch) >= batch_size:
+            Recipe.objects.bulk_update(batch, ["trending_score", "trending_updated_at"])
+            refreshed += len(batch)
+            batch = []
+    Recipe.objects.bulk_update(batch, ["trending_score", "trending_updated_at"])
+    refreshed += len(batch)
+    cache_trending_ids()
+    return refreshed
+
+
+def cache_trending_ids():
+    recipe_ids = list(
+        Recipe.objects.filter(trending_score__gt=0)
+        .order_by("-trending_score", "-id")
+        .values_list("id", flat=True)[:TRENDING_TOP_COUNT]
+    )
+    # Общий кеш: топ, посчитанный командой refresh_trending, видят воркеры.
+    caches[settings.SHARED_CACHE_ALIAS].set(
+        TRENDING_CACHE_KEY, recipe_ids, TRENDING_CACHE_TIMEOUT
+    )
+    return recipe_ids
+
+
+def get_trending_ids():
+    recipe_ids = caches[settings.SHARED_CACHE_ALIAS].get(TRENDING_CACHE_KEY)
+    if recipe_ids is None:
+        recipe_ids = cache_trending_ids()
+    return recipe_ids
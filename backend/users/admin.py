@@ -1,9 +1,12 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
+from recipes.admin_utils import LargeTableAdminMixin, SoftDeleteAdminMixin
+from recipes.deletion import soft_delete_users
 from .models import User
 
 
 @admin.register(User)
-class UserAdmin(BaseUserAdmin):
+class UserAdmin(SoftDeleteAdminMixin, LargeTableAdminMixin, BaseUserAdmin):
     list_display = ("username", "email", "first_name", "last_name", "is_staff")
     search_fields = ("email", "username")
+    soft_delete = staticmethod(soft_delete_users)
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.2 on 2026-10-19 10:51
+
+import django.contrib.auth.models
+import users.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0003_alter_user_username"),
+    ]
+
+    operations = [
+        migrations.AlterModelManagers(
+            name="user",
+            managers=[
+                ("objects", users.models.NotDeletedUserManager()),
+                ("all_objects", django.contrib.auth.models.UserManager()),
+            ],
+        ),
+        migrations.AddField(
+            model_name="user",
+            name="deleted_at",
+            field=models.DateTimeField(
+                blank=True, db_index=True, null=True, verbose_name="дата удаления"
+            ),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.2 on 2026-10-19 11:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0004_soft_delete"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="user",
+            name="avatar",
+            field=models.ImageField(
+                blank=True,
+                db_index=True,
+                null=True,
+                upload_to="users/avatars/",
+                verbose_name="аватар",
+            ),
+        ),
+    ]
@@ -1,8 +1,15 @@
-from django.contrib.auth.models import AbstractUser
+from django.contrib.auth.models import AbstractUser, UserManager
 from django.db import models
 from django.core.validators import RegexValidator
 
 
+class NotDeletedUserManager(UserManager):
+    # Пользователи, помеченные на удаление, скрыты до фоновой очистки.
+
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at__isnull=True)
+
+
 class User(AbstractUser):
     email = models.EmailField("адрес электронной почты", unique=True, max_length=254)
     username = models.CharField(
@@ -19,11 +26,17 @@ class User(AbstractUser):
     first_name = models.CharField("имя", max_length=150)
     last_name = models.CharField("фамилия", max_length=150)
     avatar = models.ImageField(
-        "аватар", upload_to="users/avatars/", null=True, blank=True
+        "аватар", upload_to="users/avatars/", null=True, blank=True, db_index=True
+    )
+    deleted_at = models.DateTimeField(
+        "дата удаления", null=True, blank=True, db_index=True
     )
     USERNAME_FIELD = "email"
     REQUIRED_FIELDS = ["username", "first_name", "last_name"]
 
+    objects = NotDeletedUserManager()
+    all_objects = UserManager()
+
     class Meta:
         verbose_name = "Пользователь"
         verbose_name_plural = "Пользователи"
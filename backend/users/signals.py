@@ -0,0 +1,23 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from foodgram.storage import (
+    delete_file_on_commit,
+    release_replaced_file,
+    remember_replaced_file,
+)
+from .models import User
+
+
+@receiver(pre_save, sender=User)
+def remember_replaced_avatar(sender, instance, update_fields=None, **kwargs):
+    remember_replaced_file(instance, "avatar", update_fields)
+
+
+@receiver(post_save, sender=User)
+def release_replaced_avatar(sender, instance, **kwargs):
+    release_replaced_file(instance, "avatar")
+
+
+@receiver(post_delete, sender=User)
+def release_avatar(sender, instance, **kwargs):
+    delete_file_on_commit(instance.avatar.storage, instance.avatar.name)